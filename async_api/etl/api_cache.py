@@ -0,0 +1,68 @@
+from configs import loguru_config, settings_config
+from loguru import logger
+from redis import Redis, RedisError
+
+logger.add(**loguru_config)
+
+PERSON_FIELDS = ('director_ids', 'actor_ids', 'writer_ids')
+# The documents indexed before the flat id fields were introduced only have the nested ones
+NESTED_PERSON_FIELDS = ('directors', 'actors', 'writers')
+# The fields of the indexed documents needed to invalidate the cache before they are replaced
+SOURCE_FIELDS = {
+    'movies': [*PERSON_FIELDS, *(f'{field}.id' for field in NESTED_PERSON_FIELDS)],
+}
+
+
+class ApiCacheInvalidator:
+    """
+    Drops the API cache entries built from the documents loaded by the ETL. The films of a
+    person are cached by the API in a Redis hash per person, so all of their pages are dropped
+    with a single key.
+    """
+
+    def __init__(self, redis: Redis, person_films_key: str):
+        self.redis = redis
+        self.person_films_key = person_films_key
+
+    @staticmethod
+    def get_person_ids(documents: list[dict], index_name: str) -> set[str]:
+        """
+        Returns the ids of the persons whose films may have changed with the documents.
+        """
+
+        if index_name == 'movies':
+            return {
+                str(person_id)
+                for document in documents
+                for field in PERSON_FIELDS
+                for person_id in document.get(field) or ()
+            } | {
+                str(person['id'])
+                for document in documents
+                for field in NESTED_PERSON_FIELDS
+                for person in document.get(field) or ()
+            }
+        if index_name == 'persons':
+            return {str(document['id']) for document in documents}
+        return set()
+
+    def invalidate(self, documents: list[dict], index_name: str) -> None:
+        """
+        Pass both the new documents and the indexed ones they replace or delete, so the persons
+        removed from a film are invalidated too. A failure is only logged, the cache entries
+        expire anyway after their timeout.
+        """
+
+        person_ids = self.get_person_ids(documents, index_name)
+        if not person_ids:
+            return
+        keys = [f'{self.person_films_key}:{person_id}' for person_id in person_ids]
+        try:
+            for start in range(0, len(keys), settings_config.CHUNK_SIZE):
+                self.redis.delete(*keys[start : start + settings_config.CHUNK_SIZE])
+        except RedisError as e:
+            logger.warning(
+                'Failed to invalidate the API cache of index "{}". Error: {}.',
+                index_name,
+                e,
+            )
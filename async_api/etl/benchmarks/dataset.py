@@ -0,0 +1,218 @@
+"""
+Synthetic `content` schema dataset loaded into PostgreSQL with COPY.
+
+The schema is dropped and created again, so point the ETL environment at a scratch database.
+"""
+import io
+import random
+
+from datetime import date, datetime, timedelta, timezone
+from typing import Iterable
+
+from benchmarks.synthetic import MOVIE_TYPES, ROLES, make_uuid
+
+SCHEMA_SQL = """
+    DROP SCHEMA IF EXISTS content CASCADE;
+    CREATE SCHEMA content;
+
+    CREATE TABLE content.film_work (
+        id uuid PRIMARY KEY,
+        title TEXT NOT NULL,
+        description TEXT,
+        creation_date DATE,
+        rating FLOAT,
+        type TEXT NOT NULL,
+        file_path TEXT,
+        created_at timestamp with time zone,
+        updated_at timestamp with time zone
+    );
+
+    CREATE TABLE content.genre (
+        id uuid PRIMARY KEY,
+        name TEXT NOT NULL,
+        description TEXT,
+        created_at timestamp with time zone,
+        updated_at timestamp with time zone
+    );
+
+    CREATE TABLE content.person (
+        id uuid PRIMARY KEY,
+        full_name TEXT NOT NULL,
+        created_at timestamp with time zone,
+        updated_at timestamp with time zone
+    );
+
+    CREATE TABLE content.genre_film_work (
+        id uuid PRIMARY KEY,
+        genre_id uuid NOT NULL,
+        film_work_id uuid NOT NULL,
+        created_at timestamp with time zone
+    );
+
+    CREATE TABLE content.person_film_work (
+        id uuid PRIMARY KEY,
+        person_id uuid NOT NULL,
+        film_work_id uuid NOT NULL,
+        role TEXT NOT NULL,
+        created_at timestamp with time zone
+    );
+"""
+
+CONSTRAINTS_SQL = """
+    ALTER TABLE content.genre_film_work
+        ADD FOREIGN KEY (genre_id) REFERENCES content.genre (id) ON DELETE CASCADE,
+        ADD FOREIGN KEY (film_work_id) REFERENCES content.film_work (id) ON DELETE CASCADE;
+    ALTER TABLE content.person_film_work
+        ADD FOREIGN KEY (person_id) REFERENCES content.person (id) ON DELETE CASCADE,
+        ADD FOREIGN KEY (film_work_id) REFERENCES content.film_work (id) ON DELETE CASCADE;
+
+    CREATE UNIQUE INDEX film_work_genre_idx
+        ON content.genre_film_work (film_work_id, genre_id);
+    CREATE UNIQUE INDEX film_work_person_role_idx
+        ON content.person_film_work (film_work_id, person_id, role);
+    CREATE INDEX person_film_work_person_idx ON content.person_film_work (person_id);
+    CREATE INDEX genre_film_work_genre_idx ON content.genre_film_work (genre_id);
+    CREATE INDEX film_work_updated_at_idx ON content.film_work (updated_at, id);
+    CREATE INDEX person_updated_at_idx ON content.person (updated_at);
+    CREATE INDEX genre_updated_at_idx ON content.genre (updated_at);
+
+    ANALYZE;
+"""
+
+COPY_BATCH_SIZE = 10000
+
+
+def to_copy_value(value) -> str:
+    if value is None:
+        return r'\N'
+    return str(value).replace('\\', '\\\\').replace('\t', ' ').replace('\n', ' ')
+
+
+def copy_rows(
+    cursor, table: str, columns: tuple[str, ...], rows: Iterable[tuple]
+) -> None:
+    """
+    Copies the rows into the table in batches of `COPY_BATCH_SIZE`.
+    """
+
+    def flush(batch: list[str]) -> None:
+        cursor.copy_expert(
+            f'COPY content.{table} ({", ".join(columns)}) FROM STDIN',
+            io.StringIO(''.join(batch)),
+        )
+
+    batch = []
+    for row in rows:
+        batch.append('\t'.join(to_copy_value(value) for value in row) + '\n')
+        if len(batch) >= COPY_BATCH_SIZE:
+            flush(batch)
+            batch = []
+    if batch:
+        flush(batch)
+
+
+def generate(
+    connection,
+    movies_count: int,
+    persons_count: int,
+    genres_count: int = 30,
+    persons_per_movie: int = 10,
+    genres_per_movie: int = 3,
+    seed: int = 42,
+) -> None:
+    """
+    Creates the `content` schema and fills it with a synthetic dataset. Update times are
+    spread over the last year, so incremental passes see a realistic ordering.
+    """
+
+    rnd = random.Random(seed)
+    now = datetime.now(timezone.utc)
+
+    def updated_at() -> datetime:
+        return now - timedelta(seconds=rnd.randint(0, 365 * 24 * 3600))
+
+    genre_ids = [make_uuid(rnd) for _ in range(genres_count)]
+    person_ids = [make_uuid(rnd) for _ in range(persons_count)]
+    movie_ids = [make_uuid(rnd) for _ in range(movies_count)]
+
+    with connection.cursor() as cursor:
+        cursor.execute(SCHEMA_SQL)
+        copy_rows(
+            cursor,
+            'genre',
+            ('id', 'name', 'description', 'created_at', 'updated_at'),
+            (
+                (
+                    genre_id,
+                    f'Genre {number}',
+                    f'Description of genre {number}',
+                    now,
+                    updated_at(),
+                )
+                for number, genre_id in enumerate(genre_ids)
+            ),
+        )
+        copy_rows(
+            cursor,
+            'person',
+            ('id', 'full_name', 'created_at', 'updated_at'),
+            (
+                (person_id, f'Person {number}', now, updated_at())
+                for number, person_id in enumerate(person_ids)
+            ),
+        )
+        copy_rows(
+            cursor,
+            'film_work',
+            (
+                'id',
+                'title',
+                'description',
+                'creation_date',
+                'rating',
+                'type',
+                'file_path',
+                'created_at',
+                'updated_at',
+            ),
+            (
+                (
+                    movie_id,
+                    f'Movie {number}',
+                    f'Description of movie {number}',
+                    date(rnd.randint(1950, 2023), 1, 1),
+                    round(rnd.uniform(0, 10), 1),
+                    rnd.choice(MOVIE_TYPES),
+                    None,
+                    now,
+                    updated_at(),
+                )
+                for number, movie_id in enumerate(movie_ids)
+            ),
+        )
+        copy_rows(
+            cursor,
+            'person_film_work',
+            ('id', 'person_id', 'film_work_id', 'role', 'created_at'),
+            (
+                (make_uuid(rnd), person_id, movie_id, rnd.choice(ROLES), now)
+                for movie_id in movie_ids
+                for person_id in rnd.sample(
+                    person_ids, min(persons_per_movie, persons_count)
+                )
+            ),
+        )
+        copy_rows(
+            cursor,
+            'genre_film_work',
+            ('id', 'genre_id', 'film_work_id', 'created_at'),
+            (
+                (make_uuid(rnd), genre_id, movie_id, now)
+                for movie_id in movie_ids
+                for genre_id in rnd.sample(
+                    genre_ids, min(genres_per_movie, genres_count)
+                )
+            ),
+        )
+        cursor.execute(CONSTRAINTS_SQL)
+    connection.commit()
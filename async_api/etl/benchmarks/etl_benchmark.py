@@ -0,0 +1,175 @@
+"""
+End-to-end benchmark of the ETL pipeline: PostgresExtractor -> DataTransformer ->
+ElasticsearchLoader for every index.
+
+Data is read from the PostgreSQL database of the ETL environment. `--generate` replaces its
+`content` schema with a synthetic dataset, so only use it with a scratch database. Documents
+are sent to a local recording stand-in of the bulk API unless `--es-url` points to a real
+Elasticsearch. Logging is disabled while the pipeline runs. Run from the `etl` directory:
+
+    python -m benchmarks.etl_benchmark --generate --movies 100000 --output results.json
+    python -m benchmarks.etl_benchmark --baseline results.json
+"""
+import argparse
+import json
+import os
+import resource
+import sys
+import time
+
+from contextlib import nullcontext
+from datetime import datetime
+
+from dotenv import find_dotenv, load_dotenv
+
+load_dotenv(find_dotenv(usecwd=True))
+for env_name, env_value in {'ES_HOST': 'localhost', 'ES_PORT': '9200'}.items():
+    os.environ.setdefault(env_name, env_value)
+
+import psycopg2  # noqa: E402
+
+from benchmarks.dataset import generate  # noqa: E402
+from benchmarks.fake_elasticsearch import FakeElasticsearch  # noqa: E402
+from configs import pg_config  # noqa: E402
+from indexes import ALL_INDEXES  # noqa: E402
+from load import ElasticsearchLoader  # noqa: E402
+from loguru import logger  # noqa: E402
+from main import IndexWorker  # noqa: E402
+from metrics import STAGES, CycleStats  # noqa: E402
+from transform import DataTransformer  # noqa: E402
+
+
+def peak_rss_mib() -> float:
+    # ru_maxrss is reported in KiB on Linux.
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def run_index(
+    index_name: str, es_url: str, chunk_size: int, strategy: str, validation: str
+) -> dict:
+    worker = IndexWorker(index_name, state=None)
+    worker.psql.movies_strategy = strategy
+    worker.transform = DataTransformer(validation=validation)
+    worker.es = ElasticsearchLoader(es_url=es_url)
+    worker.psql.connect_to_postgres()
+    worker.es.connect_to_elastic()
+    try:
+        worker.es.create_index(index_name)
+        stats = CycleStats(index_name)
+        for rows in stats.extract(
+            worker.psql.get_movies_data(datetime.min, index_name, chunk_size)
+        ):
+            worker.transfer(rows, index_name, stats)
+        elapsed = time.perf_counter() - stats.started_at
+    finally:
+        worker.psql.close()
+    documents = stats.rows['load']
+    return {
+        'documents': documents,
+        'seconds': elapsed,
+        'docs_per_second': documents / elapsed if elapsed else 0,
+        'stage_seconds': {stage: stats.seconds[stage] for stage in STAGES},
+        'kib': stats.bytes / 1024,
+        'peak_rss_mib': peak_rss_mib(),
+    }
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list[str]:
+    regressions = []
+    for index_name, result in results.items():
+        expected = baseline.get(index_name, {}).get('docs_per_second')
+        if expected and result['docs_per_second'] < expected * (1 - tolerance):
+            regressions.append(
+                f'{index_name}: {result["docs_per_second"]:.0f} docs/s, '
+                f'baseline {expected:.0f} docs/s'
+            )
+    return regressions
+
+
+def run(args: argparse.Namespace) -> int:
+    if args.generate:
+        print(f'Generating {args.movies} movies and {args.persons} persons...')
+        connection = psycopg2.connect(dsn=pg_config.dsn)
+        try:
+            generate(
+                connection,
+                movies_count=args.movies,
+                persons_count=args.persons,
+                genres_count=args.genres,
+                persons_per_movie=args.persons_per_movie,
+                genres_per_movie=args.genres_per_movie,
+            )
+        finally:
+            connection.close()
+
+    logger.remove()
+    fake = FakeElasticsearch() if args.es_url is None else None
+    results = {}
+    with fake or nullcontext():
+        es_url = args.es_url or fake.url
+        for index_name in args.indices or list(ALL_INDEXES):
+            results[index_name] = run_index(
+                index_name, es_url, args.chunk_size, args.strategy, args.validation
+            )
+
+    print(
+        f'strategy={args.strategy} validation={args.validation} chunk={args.chunk_size}'
+    )
+    for index_name, result in results.items():
+        stages = ', '.join(
+            f'{stage} {seconds:.2f}s'
+            for stage, seconds in result['stage_seconds'].items()
+        )
+        print(
+            f'{index_name:>8}: {result["documents"]} docs in {result["seconds"]:.2f}s, '
+            f'{result["docs_per_second"]:.0f} docs/s, {result["kib"] / 1024:.1f} MiB sent, '
+            f'peak RSS {result["peak_rss_mib"]:.0f} MiB ({stages})'
+        )
+    if fake is not None:
+        print(
+            f'Bulk stand-in received {fake.record.requests} requests, '
+            f'{fake.record.documents} documents'
+        )
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for regression in regressions:
+            print(f'Regression: {regression}')
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument('--generate', action='store_true')
+    parser.add_argument('--movies', type=int, default=100000)
+    parser.add_argument('--persons', type=int, default=20000)
+    parser.add_argument('--genres', type=int, default=30)
+    parser.add_argument('--persons-per-movie', type=int, default=10)
+    parser.add_argument('--genres-per-movie', type=int, default=3)
+    parser.add_argument('--indices', nargs='*', choices=list(ALL_INDEXES))
+    parser.add_argument('--chunk-size', type=int, default=200)
+    parser.add_argument(
+        '--strategy', choices=('aggregate', 'flat'), default='aggregate'
+    )
+    parser.add_argument(
+        '--validation', choices=('strict', 'sampled', 'off'), default='sampled'
+    )
+    parser.add_argument(
+        '--es-url', help='Elasticsearch to load into instead of the stand-in'
+    )
+    parser.add_argument('--output', help='File to write the results to as JSON')
+    parser.add_argument('--baseline', help='Results file to compare docs/s against')
+    parser.add_argument(
+        '--tolerance',
+        type=float,
+        default=0.2,
+        help='Allowed docs/s drop against the baseline, 0.2 by default',
+    )
+    sys.exit(run(parser.parse_args()))
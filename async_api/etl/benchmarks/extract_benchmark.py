@@ -0,0 +1,68 @@
+"""
+Benchmark of the movies extraction strategies against the configured PostgreSQL database.
+
+Both strategies read every film work and the documents they produce are compared. Run from
+the `etl` directory with the usual ETL environment:
+
+    python -m benchmarks.extract_benchmark --chunk-size 200
+"""
+import argparse
+import time
+
+from datetime import datetime
+
+from configs import pg_config
+from psql_extractor import PostgresExtractor
+from sql_queries import ALL_SQL_QUERIES
+
+STRATEGIES = ('aggregate', 'flat')
+
+
+def normalize(row: dict) -> tuple:
+    persons = sorted(
+        (str(person['id']), person['role'], person['full_name'])
+        for person in row['all_persons']
+    )
+    genres = sorted(str(genre['id']) for genre in row['all_genres'])
+    return row['title'], tuple(persons), tuple(genres)
+
+
+def extract(strategy: str, chunk_size: int) -> tuple[float, dict[str, tuple]]:
+    extractor = PostgresExtractor(
+        dsn=pg_config.dsn, all_queries=ALL_SQL_QUERIES, movies_strategy=strategy
+    )
+    extractor.connect_to_postgres()
+    documents = {}
+    try:
+        started = time.perf_counter()
+        for rows in extractor.get_movies_data(datetime.min, 'movies', chunk_size):
+            for row in rows:
+                documents[str(row['id'])] = normalize(row)
+        elapsed = time.perf_counter() - started
+    finally:
+        extractor.close()
+    return elapsed, documents
+
+
+def run(chunk_size: int) -> None:
+    results = {strategy: extract(strategy, chunk_size) for strategy in STRATEGIES}
+    for strategy, (elapsed, documents) in results.items():
+        print(
+            f'{strategy:>9}: {len(documents)} movies in {elapsed:8.3f} s, '
+            f'{len(documents) / elapsed:10.0f} rows/s'
+        )
+    aggregate_documents = results['aggregate'][1]
+    flat_documents = results['flat'][1]
+    mismatches = [
+        movie_id
+        for movie_id in aggregate_documents.keys() | flat_documents.keys()
+        if aggregate_documents.get(movie_id) != flat_documents.get(movie_id)
+    ]
+    print(f'Documents that differ between the strategies: {len(mismatches)}')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--chunk-size', type=int, default=200)
+    args = parser.parse_args()
+    run(args.chunk_size)
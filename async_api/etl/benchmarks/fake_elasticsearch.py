@@ -0,0 +1,116 @@
+"""
+A local stand-in for Elasticsearch that records bulk requests instead of indexing them.
+
+It answers just enough of the REST API for the ETL loader: the product check, index
+existence checks and creation, settings updates and `_bulk`. Every bulk request is parsed,
+so the client pays the full serialization and HTTP cost of a real load.
+"""
+import json
+import threading
+
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+BULK_SOURCE_ACTIONS = ('index', 'create', 'update')
+
+
+@dataclass
+class BulkRecord:
+    requests: int = 0
+    documents: int = 0
+    bytes: int = 0
+
+
+class FakeElasticsearchHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    def read_body(self) -> bytes:
+        return self.rfile.read(int(self.headers.get('Content-Length') or 0))
+
+    def respond(self, status: int, body: dict = None) -> None:
+        payload = json.dumps(body).encode() if body is not None else b''
+        self.send_response(status)
+        self.send_header('X-Elastic-Product', 'Elasticsearch')
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        if self.command != 'HEAD':
+            self.wfile.write(payload)
+
+    def do_HEAD(self):
+        self.respond(404)
+
+    def do_GET(self):
+        if self.path.split('?')[0] == '/':
+            self.respond(
+                200,
+                {
+                    'version': {'number': '7.17.0', 'build_flavor': 'default'},
+                    'tagline': 'You Know, for Search',
+                },
+            )
+        else:
+            self.respond(200, {})
+
+    def do_PUT(self):
+        self.read_body()
+        index = self.path.split('?')[0].strip('/').split('/')[0]
+        self.respond(200, {'acknowledged': True, 'index': index})
+
+    def do_DELETE(self):
+        self.respond(200, {'acknowledged': True})
+
+    def do_POST(self):
+        body = self.read_body()
+        if '_bulk' not in self.path:
+            self.respond(200, {'acknowledged': True})
+            return
+
+        items = []
+        lines = iter(body.splitlines())
+        for line in lines:
+            if not line:
+                continue
+            action, meta = next(iter(json.loads(line).items()))
+            if action in BULK_SOURCE_ACTIONS:
+                next(lines, None)
+            items.append({action: {**meta, 'status': 200, 'result': 'created'}})
+
+        record = self.server.record
+        with self.server.lock:
+            record.requests += 1
+            record.documents += len(items)
+            record.bytes += len(body)
+        self.respond(200, {'took': 0, 'errors': False, 'items': items})
+
+
+class FakeElasticsearch:
+    """
+    Runs the stand-in on a free local port in a background thread.
+    """
+
+    def __init__(self):
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), FakeElasticsearchHandler)
+        self.server.record = BulkRecord()
+        self.server.lock = threading.Lock()
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        host, port = self.server.server_address
+        return f'http://{host}:{port}'
+
+    @property
+    def record(self) -> BulkRecord:
+        return self.server.record
+
+    def __enter__(self) -> 'FakeElasticsearch':
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.server.shutdown()
+        self.server.server_close()
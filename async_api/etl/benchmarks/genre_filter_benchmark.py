@@ -0,0 +1,112 @@
+"""
+Benchmark of genre filtering on the movies index: a `nested` query over `genres` against a
+`terms` filter on the flat `genre_ids` field.
+
+Synthetic movies are loaded into a temporary index of the configured Elasticsearch, which is
+deleted afterwards. The request cache is bypassed, so every query is executed. Run from the
+`etl` directory with the usual ETL environment:
+
+    python -m benchmarks.genre_filter_benchmark --movies 100000 --queries 200
+"""
+import argparse
+import random
+import statistics
+import time
+
+from benchmarks.synthetic import make_movie_rows
+from configs import es_config
+from elasticsearch import Elasticsearch
+from elasticsearch.helpers import bulk
+from indexes import MOVIES_INDEX
+from transform import DataTransformer
+
+INDEX_NAME = 'genre_filter_benchmark'
+
+
+def nested_query(genre_id: str) -> dict:
+    return {
+        'bool': {
+            'filter': [
+                {
+                    'nested': {
+                        'path': 'genres',
+                        'query': {'term': {'genres.id': genre_id}},
+                    }
+                }
+            ]
+        }
+    }
+
+
+def flat_query(genre_id: str) -> dict:
+    return {'bool': {'filter': [{'terms': {'genre_ids': [genre_id]}}]}}
+
+
+QUERIES = {'nested': nested_query, 'flat': flat_query}
+
+
+def load(es: Elasticsearch, movies_count: int) -> list[str]:
+    rows = make_movie_rows(movies_count)
+    documents = DataTransformer(validation='off').transform_movies_data(rows, 'movies')
+    es.indices.create(index=INDEX_NAME, body=MOVIES_INDEX)
+    bulk(
+        es,
+        ({'_index': INDEX_NAME, '_id': doc['id'], '_source': doc} for doc in documents),
+        chunk_size=1000,
+    )
+    es.indices.refresh(index=INDEX_NAME)
+    es.indices.forcemerge(index=INDEX_NAME, max_num_segments=1, request_timeout=600)
+    return sorted({genre['id'] for row in rows for genre in row['all_genres']})
+
+
+def measure(
+    es: Elasticsearch, genre_ids: list[str], name: str, queries_count: int
+) -> tuple[list[float], list[float]]:
+    """
+    Returns the `took` and the wall-clock latencies of the queries in milliseconds.
+    """
+
+    rnd = random.Random(42)
+    took, wall = [], []
+    for _ in range(queries_count):
+        body = {
+            'size': 20,
+            'track_total_hits': False,
+            'sort': {'imdb_rating': 'desc'},
+            'query': QUERIES[name](rnd.choice(genre_ids)),
+        }
+        started = time.perf_counter()
+        response = es.search(index=INDEX_NAME, body=body, request_cache=False)
+        wall.append((time.perf_counter() - started) * 1000)
+        took.append(response['took'])
+    return took, wall
+
+
+def run(movies_count: int, queries_count: int) -> None:
+    es = Elasticsearch(hosts=[es_config.url])
+    es.indices.delete(index=INDEX_NAME, ignore=404)
+    try:
+        genre_ids = load(es, movies_count)
+        print(
+            f'{movies_count} movies, {len(genre_ids)} genres, {queries_count} queries'
+        )
+        for name in QUERIES:
+            # Warm up the caches of the fields before measuring.
+            measure(es, genre_ids, name, 10)
+        for name in QUERIES:
+            took, wall = measure(es, genre_ids, name, queries_count)
+            print(
+                f'{name:>7}: took median {statistics.median(took):6.1f} ms, '
+                f'p95 {statistics.quantiles(took, n=20)[-1]:6.1f} ms; '
+                f'wall median {statistics.median(wall):6.1f} ms'
+            )
+    finally:
+        es.indices.delete(index=INDEX_NAME, ignore=404)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--movies', type=int, default=100000)
+    parser.add_argument('--queries', type=int, default=200)
+    args = parser.parse_args()
+    run(args.movies, args.queries)
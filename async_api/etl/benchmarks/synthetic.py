@@ -0,0 +1,67 @@
+"""
+Synthetic data shaped like the rows returned by the ETL SQL queries.
+"""
+import random
+
+from datetime import date
+from uuid import UUID
+
+MOVIE_TYPES = ('movie', 'tv_show')
+ROLES = ('director', 'actor', 'writer')
+
+
+def make_uuid(rnd: random.Random) -> str:
+    return str(UUID(int=rnd.getrandbits(128), version=4))
+
+
+def make_genres(rnd: random.Random, count: int = 30) -> list[dict]:
+    return [
+        {
+            'id': make_uuid(rnd),
+            'name': f'Genre {number}',
+            'description': f'Description of genre {number}',
+        }
+        for number in range(count)
+    ]
+
+
+def make_persons(rnd: random.Random, count: int) -> list[dict]:
+    return [
+        {'id': make_uuid(rnd), 'full_name': f'Person {number}'}
+        for number in range(count)
+    ]
+
+
+def make_movie_rows(
+    movies_count: int,
+    persons_count: int = 20000,
+    persons_per_movie: int = 10,
+    genres_per_movie: int = 3,
+    seed: int = 42,
+) -> list[dict]:
+    """
+    Returns rows in the shape of `MOVIE_SQL_QUERY` results.
+    """
+
+    rnd = random.Random(seed)
+    genres = make_genres(rnd)
+    persons = make_persons(rnd, persons_count)
+    rows = []
+    for number in range(movies_count):
+        rows.append(
+            {
+                'id': make_uuid(rnd),
+                'title': f'Movie {number}',
+                'description': f'Description of movie {number}',
+                'rating': round(rnd.uniform(0, 10), 1),
+                'type': rnd.choice(MOVIE_TYPES),
+                'creation_date': date(rnd.randint(1950, 2023), 1, 1),
+                'file_path': None,
+                'all_persons': [
+                    {**person, 'role': rnd.choice(ROLES)}
+                    for person in rnd.sample(persons, persons_per_movie)
+                ],
+                'all_genres': rnd.sample(genres, genres_per_movie),
+            }
+        )
+    return rows
@@ -0,0 +1,49 @@
+"""
+Micro-benchmark of `DataTransformer` in every validation mode.
+
+Run from the `etl` directory:
+
+    python -m benchmarks.transform_benchmark --movies 100000
+"""
+import argparse
+import os
+import time
+
+for env_name, env_value in {
+    'POSTGRES_HOST': 'localhost',
+    'POSTGRES_PORT': '5432',
+    'POSTGRES_USER': 'app',
+    'POSTGRES_PASSWORD': '',
+    'POSTGRES_DB': 'movies_database',
+    'ES_HOST': 'localhost',
+    'ES_PORT': '9200',
+}.items():
+    os.environ.setdefault(env_name, env_value)
+
+from benchmarks.synthetic import make_movie_rows  # noqa: E402
+from transform import DataTransformer  # noqa: E402
+
+VALIDATION_MODES = ('strict', 'sampled', 'off')
+
+
+def run(movies_count: int, chunk_size: int) -> None:
+    rows = make_movie_rows(movies_count)
+    chunks = [rows[i : i + chunk_size] for i in range(0, len(rows), chunk_size)]
+    print(f'{movies_count} movies in chunks of {chunk_size}')
+    for validation in VALIDATION_MODES:
+        transformer = DataTransformer(validation=validation)
+        started = time.perf_counter()
+        for chunk in chunks:
+            transformer.transform_movies_data(chunk, 'movies')
+        elapsed = time.perf_counter() - started
+        print(
+            f'{validation:>8}: {elapsed:8.3f} s, {movies_count / elapsed:10.0f} docs/s'
+        )
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--movies', type=int, default=100000)
+    parser.add_argument('--chunk-size', type=int, default=200)
+    args = parser.parse_args()
+    run(args.movies, args.chunk_size)
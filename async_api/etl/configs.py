@@ -1,5 +1,5 @@
 from dotenv import find_dotenv, load_dotenv
-from schemas import CustomSettings, ElasticsearchConfig, PostgresConfig
+from schemas import CustomSettings, ElasticsearchConfig, PostgresConfig, RedisConfig
 
 load_dotenv(find_dotenv())
 
@@ -7,6 +7,8 @@ pg_config = PostgresConfig()
 
 es_config = ElasticsearchConfig()
 
+redis_config = RedisConfig()
+
 settings_config = CustomSettings()
 
 loguru_config = {
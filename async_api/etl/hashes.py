@@ -0,0 +1,122 @@
+import abc
+import dbm
+import hashlib
+
+from backoff import expo, on_exception
+from configs import loguru_config, settings_config
+from loguru import logger
+from redis import ConnectionError, Redis
+
+logger.add(**loguru_config)
+
+
+def content_hash(source: bytes) -> str:
+    """
+    Returns a compact hash of a serialized document.
+    """
+
+    return hashlib.blake2b(source, digest_size=16).hexdigest()
+
+
+class HashStore:
+    """
+    Content hashes of the documents loaded into an index, keyed by document id.
+    """
+
+    @abc.abstractmethod
+    def get_hashes(self, ids: list[str]) -> dict[str, str]:
+        """
+        Returns the stored hashes of the provided ids, ids without a hash are omitted.
+        """
+        pass
+
+    @abc.abstractmethod
+    def set_hashes(self, hashes: dict[str, str]) -> None:
+        pass
+
+    @abc.abstractmethod
+    def delete_hashes(self, ids: list[str]) -> None:
+        pass
+
+    @abc.abstractmethod
+    def clear(self) -> None:
+        pass
+
+
+class DbmHashStore(HashStore):
+    """
+    A hash store kept in a local dbm file. The file is opened for every batch only,
+    so a reindex run in another process can clear it.
+    """
+
+    def __init__(self, file_path: str):
+        self.file_path = file_path
+
+    @on_exception(expo, dbm.error, max_tries=settings_config.MAX_TRIES, logger=logger)
+    def get_hashes(self, ids: list[str]) -> dict[str, str]:
+        with dbm.open(self.file_path, 'c') as db:
+            return {
+                document_id: stored_hash.decode()
+                for document_id in ids
+                if (stored_hash := db.get(document_id)) is not None
+            }
+
+    @on_exception(expo, dbm.error, max_tries=settings_config.MAX_TRIES, logger=logger)
+    def set_hashes(self, hashes: dict[str, str]) -> None:
+        with dbm.open(self.file_path, 'c') as db:
+            for document_id, document_hash in hashes.items():
+                db[document_id] = document_hash
+
+    @on_exception(expo, dbm.error, max_tries=settings_config.MAX_TRIES, logger=logger)
+    def delete_hashes(self, ids: list[str]) -> None:
+        with dbm.open(self.file_path, 'c') as db:
+            for document_id in ids:
+                if document_id in db:
+                    del db[document_id]
+
+    @on_exception(expo, dbm.error, max_tries=settings_config.MAX_TRIES, logger=logger)
+    def clear(self) -> None:
+        with dbm.open(self.file_path, 'n'):
+            pass
+
+
+class RedisHashStore(HashStore):
+    """
+    A hash store kept in a Redis hash, so it can be shared by several ETL processes.
+    """
+
+    def __init__(self, redis: Redis, key: str):
+        self.redis = redis
+        self.key = key
+
+    @on_exception(
+        expo, ConnectionError, max_tries=settings_config.MAX_TRIES, logger=logger
+    )
+    def get_hashes(self, ids: list[str]) -> dict[str, str]:
+        if not ids:
+            return {}
+        return {
+            document_id: stored_hash.decode()
+            for document_id, stored_hash in zip(ids, self.redis.hmget(self.key, ids))
+            if stored_hash is not None
+        }
+
+    @on_exception(
+        expo, ConnectionError, max_tries=settings_config.MAX_TRIES, logger=logger
+    )
+    def set_hashes(self, hashes: dict[str, str]) -> None:
+        if hashes:
+            self.redis.hset(self.key, mapping=hashes)
+
+    @on_exception(
+        expo, ConnectionError, max_tries=settings_config.MAX_TRIES, logger=logger
+    )
+    def delete_hashes(self, ids: list[str]) -> None:
+        if ids:
+            self.redis.hdel(self.key, *ids)
+
+    @on_exception(
+        expo, ConnectionError, max_tries=settings_config.MAX_TRIES, logger=logger
+    )
+    def clear(self) -> None:
+        self.redis.delete(self.key)
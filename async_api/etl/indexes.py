@@ -1,6 +1,20 @@
+LIVE_INDEX_SETTINGS = {
+    "index": {
+        "refresh_interval": "1s",
+        "number_of_replicas": 1,
+    },
+}
+
+BULK_LOAD_INDEX_SETTINGS = {
+    "index": {
+        "refresh_interval": "-1",
+        "number_of_replicas": 0,
+    },
+}
+
 SETTINGS_BODY = {
     "settings": {
-        "refresh_interval": "1s",
+        **LIVE_INDEX_SETTINGS["index"],
         "analysis": {
             "filter": {
                 "english_stop": {"type": "stop", "stopwords": "_english_"},
@@ -53,13 +67,20 @@ MOVIES_INDEX = {
             "title": {
                 "type": "text",
                 "analyzer": "ru_en",
-                "fields": {"raw": {"type": "keyword"}},
+                "fields": {
+                    "raw": {"type": "keyword"},
+                    "suggest": {"type": "completion", "analyzer": "simple"},
+                },
             },
             "file_path": {"type": "keyword"},
             "description": {"type": "text", "analyzer": "ru_en"},
             "directors_names": {"type": "text", "analyzer": "ru_en"},
             "actors_names": {"type": "text", "analyzer": "ru_en"},
             "writers_names": {"type": "text", "analyzer": "ru_en"},
+            "genre_ids": {"type": "keyword"},
+            "director_ids": {"type": "keyword"},
+            "actor_ids": {"type": "keyword"},
+            "writer_ids": {"type": "keyword"},
             "directors": {
                 "type": "nested",
                 "dynamic": "strict",
@@ -97,7 +118,10 @@ PERSONS_INDEX = {
             "full_name": {
                 "type": "text",
                 "analyzer": "ru_en",
-                "fields": {"raw": {"type": "keyword"}},
+                "fields": {
+                    "raw": {"type": "keyword"},
+                    "suggest": {"type": "completion", "analyzer": "simple"},
+                },
             },
             "roles": {"type": "keyword"},
             "movies_ids": {"type": "keyword"},
@@ -0,0 +1,126 @@
+import json
+import select
+import time
+
+from dataclasses import dataclass, field
+from typing import Optional
+
+import psycopg2
+
+from backoff import expo, on_exception
+from configs import loguru_config, settings_config
+from loguru import logger
+from psycopg2 import OperationalError
+from psycopg2.extensions import ISOLATION_LEVEL_AUTOCOMMIT
+from sql_queries import CHANGES_CHANNEL, NOTIFY_TRIGGERS_SQL
+
+logger.add(**loguru_config)
+
+
+@dataclass
+class Changes:
+    """
+    Ids of the documents affected by a batch of changes in the `content` schema.
+    `movies_by_person_ids` and `movies_by_genre_ids` hold persons and genres whose own rows
+    changed, so every movie they appear in has to be reindexed too.
+    """
+
+    index_ids: dict[str, set[str]] = field(
+        default_factory=lambda: {'movies': set(), 'genres': set(), 'persons': set()}
+    )
+    movies_by_person_ids: set[str] = field(default_factory=set)
+    movies_by_genre_ids: set[str] = field(default_factory=set)
+    count: int = 0
+
+    def add(self, change: dict) -> None:
+        table = change['table']
+        if table == 'film_work':
+            self.index_ids['movies'].add(change['id'])
+        elif table == 'person':
+            self.index_ids['persons'].add(change['id'])
+            self.movies_by_person_ids.add(change['id'])
+        elif table == 'genre':
+            self.index_ids['genres'].add(change['id'])
+            self.movies_by_genre_ids.add(change['id'])
+        elif table == 'person_film_work':
+            self.index_ids['movies'].add(change['film_work_id'])
+            self.index_ids['persons'].add(change['person_id'])
+        elif table == 'genre_film_work':
+            self.index_ids['movies'].add(change['film_work_id'])
+        self.count += 1
+
+
+class ChangeListener:
+    """
+    A class that receives change notifications sent by the `content` schema triggers with
+    PostgreSQL LISTEN/NOTIFY and groups them into debounced batches.
+    """
+
+    def __init__(self, dsn: str, channel: str = CHANGES_CHANNEL):
+        self.connection = None
+        self.dsn = dsn
+        self.channel = channel
+
+    @on_exception(
+        expo, OperationalError, max_tries=settings_config.MAX_TRIES, logger=logger
+    )
+    def connect(self) -> None:
+        """
+        Connects to PostgreSQL, installs the notification triggers if configured to,
+        and subscribes to the changes channel.
+        """
+
+        logger.info('Attempting to listen to PostgreSQL channel "{}"', self.channel)
+        self.connection = psycopg2.connect(dsn=self.dsn)
+        self.connection.set_isolation_level(ISOLATION_LEVEL_AUTOCOMMIT)
+        with self.connection.cursor() as cursor:
+            if settings_config.CDC_INSTALL_TRIGGERS:
+                cursor.execute(NOTIFY_TRIGGERS_SQL)
+            cursor.execute(f'LISTEN {self.channel};')
+        logger.info('Listening to PostgreSQL channel "{}"', self.channel)
+
+    def close(self) -> None:
+        if self.connection is not None:
+            self.connection.close()
+            self.connection = None
+
+    def wait(self, timeout: float) -> bool:
+        """
+        Waits until notifications arrive or the timeout expires.
+        """
+
+        if self.connection.notifies:
+            return True
+        readable, _, _ = select.select([self.connection], [], [], timeout)
+        return bool(readable)
+
+    def collect(
+        self,
+        timeout: float,
+        debounce: float = settings_config.CDC_DEBOUNCE,
+        max_delay: float = settings_config.CDC_MAX_DELAY,
+        max_batch: int = settings_config.CDC_MAX_BATCH,
+    ) -> Optional[Changes]:
+        """
+        Waits up to `timeout` seconds for the first notification, then keeps collecting until
+        no notification arrived for `debounce` seconds, `max_delay` seconds passed since the
+        first one or `max_batch` notifications were received. Returns None on timeout.
+        """
+
+        if not self.wait(timeout):
+            return None
+
+        changes = Changes()
+        first_received = time.monotonic()
+        while True:
+            self.connection.poll()
+            while self.connection.notifies:
+                notify = self.connection.notifies.pop(0)
+                changes.add(json.loads(notify.payload))
+            remaining = max_delay - (time.monotonic() - first_received)
+            if changes.count >= max_batch or remaining <= 0:
+                break
+            if not self.wait(min(debounce, remaining)):
+                break
+        logger.info('Received {} change notifications', changes.count)
+        return changes
@@ -1,20 +1,35 @@
+import re
+
+from contextlib import contextmanager
+from copy import deepcopy
+from dataclasses import dataclass
+from typing import Iterator, Optional
+
 from backoff import expo, on_exception
 from configs import loguru_config, settings_config
 from elasticsearch import (
     ConnectionTimeout,
     Elasticsearch,
+    NotFoundError,
     RequestError,
     SerializationError,
     TransportError,
 )
 from elasticsearch.helpers import bulk
-from indexes import ALL_INDEXES
+from hashes import HashStore, content_hash
+from indexes import ALL_INDEXES, BULK_LOAD_INDEX_SETTINGS, LIVE_INDEX_SETTINGS
 from loguru import logger
-from schemas import MovieData
 
 logger.add(**loguru_config)
 
 
+@dataclass
+class LoadResult:
+    loaded: int = 0
+    skipped: int = 0
+    size: int = 0
+
+
 class ElasticsearchLoader:
     """
     A class to load data into Elasticsearch.
@@ -42,31 +57,294 @@ class ElasticsearchLoader:
     @on_exception(
         expo, RequestError, max_tries=settings_config.MAX_TRIES, logger=logger
     )
-    def create_index(self, index_name: str) -> None:
+    def create_index(self, index_name: str) -> bool:
+        """
+        Creates the first version of the Elasticsearch index behind the `index_name` alias
+        if neither the alias nor an index with this name exists. Returns whether the index
+        has been created.
+        """
+
+        if self.connection.indices.exists(index=index_name):
+            self.add_missing_fields(index_name)
+            return False
+        versioned_index = f'{index_name}_v1'
+        body = {**ALL_INDEXES[index_name], 'aliases': {index_name: {}}}
+        response = self.connection.indices.create(
+            index=versioned_index, body=body, ignore=400
+        )
+        logger.info(
+            'Created index "{}" behind alias "{}". Response from Elasticsearch: {}',
+            versioned_index,
+            index_name,
+            response,
+        )
+        return 'error' not in response
+
+    def add_missing_fields(self, index_name: str) -> None:
         """
-        Creates the Elasticsearch index if it doesn't exist.
+        Adds the fields and the subfields of the mapping that the existing index lacks, so the
+        documents having them pass its strict mapping. The documents indexed before only get
+        the new fields once they are loaded again, which a `--reindex` does for all of them.
+        The new subfields of the existing fields are filled in place by an update by query.
         """
 
-        if not self.connection.indices.exists(index=index_name):
-            response = self.connection.indices.create(
-                index=index_name, body=ALL_INDEXES[index_name], ignore=400
+        properties = ALL_INDEXES[index_name]['mappings']['properties']
+        for versioned_index, mapping in self.connection.indices.get_mapping(
+            index=index_name
+        ).items():
+            existing = mapping['mappings'].get('properties', {})
+            missing = {}
+            with_new_subfields = []
+            for field, value in properties.items():
+                if field not in existing:
+                    missing[field] = value
+                    continue
+                existing_subfields = existing[field].get('fields', {})
+                subfields = {
+                    name: subfield
+                    for name, subfield in value.get('fields', {}).items()
+                    if name not in existing_subfields
+                }
+                if subfields:
+                    # A multi-field can be added to a field, its definition is kept as is
+                    missing[field] = {
+                        **existing[field],
+                        'fields': {**existing_subfields, **subfields},
+                    }
+                    with_new_subfields.append(field)
+            if not missing:
+                continue
+            self.connection.indices.put_mapping(
+                index=versioned_index, body={'properties': missing}
             )
             logger.info(
-                'Created index "{}". Response from Elasticsearch: {}',
-                index_name,
-                response,
+                'Added fields {} to the mapping of index "{}"',
+                ', '.join(missing),
+                versioned_index,
+            )
+            if with_new_subfields:
+                self.update_documents_having(versioned_index, with_new_subfields)
+
+    def update_documents_having(self, versioned_index: str, fields: list[str]) -> None:
+        """
+        Indexes again in place the documents having any of the fields, so their new subfields
+        are filled. The update runs in the background, the task is only logged.
+        """
+
+        response = self.connection.update_by_query(
+            index=versioned_index,
+            body={
+                'query': {
+                    'bool': {
+                        'should': [{'exists': {'field': field}} for field in fields],
+                        'minimum_should_match': 1,
+                    }
+                }
+            },
+            conflicts='proceed',
+            wait_for_completion=False,
+        )
+        logger.info(
+            'Updating the documents of index "{}" having {} in task {}',
+            versioned_index,
+            ', '.join(fields),
+            response['task'],
+        )
+
+    def get_index_versions(self, index_name: str) -> dict[str, int]:
+        """
+        Returns the versioned indices of the `index_name` alias mapped to their versions.
+        """
+
+        pattern = re.compile(rf'^{re.escape(index_name)}_v(\d+)$')
+        indices = self.connection.indices.get(index=f'{index_name}_v*')
+        return {
+            name: int(match.group(1))
+            for name in indices
+            if (match := pattern.match(name))
+        }
+
+    def get_aliased_indices(self, index_name: str) -> list[str]:
+        """
+        Returns the indices the `index_name` alias currently points to.
+        """
+
+        try:
+            return list(self.connection.indices.get_alias(name=index_name))
+        except NotFoundError:
+            return []
+
+    @on_exception(
+        expo, RequestError, max_tries=settings_config.MAX_TRIES, logger=logger
+    )
+    def create_versioned_index(self, index_name: str) -> str:
+        """
+        Creates the next version of the index with bulk-load settings and returns its name.
+        The alias is not touched, so searches keep hitting the live version.
+        """
+
+        versions = self.get_index_versions(index_name)
+        versioned_index = f'{index_name}_v{max(versions.values(), default=0) + 1}'
+        body = deepcopy(ALL_INDEXES[index_name])
+        body['settings'].update(BULK_LOAD_INDEX_SETTINGS['index'])
+        self.connection.indices.create(index=versioned_index, body=body)
+        logger.info('Created index "{}" for a full reindex', versioned_index)
+        return versioned_index
+
+    def publish_index(self, index_name: str, versioned_index: str) -> None:
+        """
+        Restores the live settings of a rebuilt index, force-merges it and atomically swaps
+        the `index_name` alias to it. Outdated versions are deleted afterwards.
+        """
+
+        self.connection.indices.put_settings(
+            index=versioned_index, body=LIVE_INDEX_SETTINGS
+        )
+        self.connection.indices.forcemerge(
+            index=versioned_index, max_num_segments=1, request_timeout=3600
+        )
+        self.connection.indices.refresh(index=versioned_index)
+
+        actions = [
+            {'remove': {'index': aliased_index, 'alias': index_name}}
+            for aliased_index in self.get_aliased_indices(index_name)
+        ]
+        if self.connection.indices.exists(
+            index=index_name
+        ) and not self.connection.indices.exists_alias(name=index_name):
+            # An unversioned index created before aliases were introduced.
+            actions.append({'remove_index': {'index': index_name}})
+        actions.append({'add': {'index': versioned_index, 'alias': index_name}})
+        self.connection.indices.update_aliases(body={'actions': actions})
+        logger.info('Alias "{}" now points to "{}"', index_name, versioned_index)
+
+        self.delete_outdated_versions(index_name)
+
+    def delete_outdated_versions(self, index_name: str) -> None:
+        """
+        Deletes all but the `KEEP_INDEX_VERSIONS` latest versions of the index.
+        The version the alias points to is never deleted.
+        """
+
+        aliased_indices = set(self.get_aliased_indices(index_name))
+        versions = sorted(
+            self.get_index_versions(index_name).items(),
+            key=lambda item: item[1],
+            reverse=True,
+        )
+        for versioned_index, _ in versions[settings_config.KEEP_INDEX_VERSIONS :]:
+            if versioned_index in aliased_indices:
+                continue
+            self.connection.indices.delete(index=versioned_index)
+            logger.info('Deleted outdated index "{}"', versioned_index)
+
+    @contextmanager
+    def bulk_load_profile(self, index_name: str) -> Iterator[None]:
+        """
+        Switches the index to the bulk-load settings for the duration of a large load, then
+        restores the live settings and refreshes the index so the loaded documents
+        become searchable.
+        """
+
+        self.connection.indices.put_settings(
+            index=index_name, body=BULK_LOAD_INDEX_SETTINGS
+        )
+        logger.info('Switched index "{}" to the bulk-load settings', index_name)
+        try:
+            yield
+        finally:
+            self.connection.indices.put_settings(
+                index=index_name, body=LIVE_INDEX_SETTINGS
             )
+            self.connection.indices.refresh(index=index_name)
+            logger.info('Restored the live settings of index "{}"', index_name)
 
     @on_exception(
         expo, SerializationError, max_tries=settings_config.MAX_TRIES, logger=logger
     )
-    def load_movies_data(self, data: list[MovieData], index_name: str) -> None:
+    def load_movies_data(
+        self,
+        data: list[dict],
+        index_name: str,
+        hash_store: Optional[HashStore] = None,
+    ) -> LoadResult:
+        """
+        Loads data into Elasticsearch. The documents are serialized here, the bulk helper
+        sends them as they are. When a hash store is given, the documents whose content hash
+        has not changed since they were last loaded are skipped, and the hashes of the loaded
+        ones are stored once the bulk request has succeeded.
+        """
+
+        dumps = self.connection.transport.serializer.dumps
+        sources = {str(row['id']): dumps(row).encode() for row in data}
+        hashes = {}
+        if hash_store is not None:
+            hashes = {
+                document_id: content_hash(source)
+                for document_id, source in sources.items()
+            }
+            stored_hashes = hash_store.get_hashes(list(hashes))
+            sources = {
+                document_id: source
+                for document_id, source in sources.items()
+                if stored_hashes.get(document_id) != hashes[document_id]
+            }
+
+        result = LoadResult(loaded=len(sources), skipped=len(data) - len(sources))
+        if sources:
+            actions = [
+                {'_index': index_name, '_id': document_id, '_source': source.decode()}
+                for document_id, source in sources.items()
+            ]
+            bulk(self.connection, actions=actions)
+            result.size = sum(len(source) for source in sources.values())
+        if hash_store is not None:
+            hash_store.set_hashes(
+                {document_id: hashes[document_id] for document_id in sources}
+            )
+        logger.info(
+            'Loaded {} documents to Elasticsearch, skipped {} unchanged.',
+            result.loaded,
+            result.skipped,
+        )
+        return result
+
+    def get_documents(
+        self, ids: list[str], index_name: str, fields: list[str]
+    ) -> list[dict]:
+        """
+        Returns the given fields of the indexed documents, the missing ones are skipped.
+        """
+
+        if not ids:
+            return []
+        try:
+            response = self.connection.mget(
+                index=index_name, body={'ids': ids}, _source_includes=fields
+            )
+        except NotFoundError:
+            return []
+        return [
+            document['_source']
+            for document in response['docs']
+            if document.get('found')
+        ]
+
+    def delete_documents(
+        self,
+        ids: list[str],
+        index_name: str,
+        hash_store: Optional[HashStore] = None,
+    ) -> None:
         """
-        Loads data into Elasticsearch.
+        Deletes documents from Elasticsearch, ignoring the ones that are already missing.
         """
 
         actions = [
-            {'_index': index_name, '_id': row.id, '_source': row.dict()} for row in data
+            {'_op_type': 'delete', '_index': index_name, '_id': document_id}
+            for document_id in ids
         ]
-        bulk(self.connection, actions=actions)
-        logger.info('Loaded {} documents to Elasticsearch.', len(data))
+        bulk(self.connection, actions=actions, raise_on_error=False)
+        if hash_store is not None:
+            hash_store.delete_hashes(ids)
+        logger.info('Deleted {} documents from Elasticsearch.', len(ids))
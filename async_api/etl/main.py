@@ -1,71 +1,369 @@
+import argparse
 import time
 
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from contextlib import nullcontext
 from datetime import datetime, timezone
+from functools import partial
+from typing import Optional
 
-from configs import es_config, loguru_config, pg_config, settings_config
+from api_cache import SOURCE_FIELDS, ApiCacheInvalidator
+from configs import es_config, loguru_config, pg_config, redis_config, settings_config
+from hashes import DbmHashStore, HashStore, RedisHashStore
 from indexes import ALL_INDEXES
+from listener import ChangeListener, Changes
 from load import ElasticsearchLoader
 from loguru import logger
+from metrics import CycleStats, start_metrics_server
 from psql_extractor import PostgresExtractor
-from sql_queries import ALL_SQL_QUERIES
-from state import JsonFileStorage, State
+from psycopg2 import DatabaseError
+from redis import Redis
+from sql_queries import ALL_COUNT_SQL_QUERIES, ALL_SQL_QUERIES
+from state import BaseStorage, JsonFileStorage, RedisStorage, State
 from transform import DataTransformer
 
 logger.add(**loguru_config)
 
 
-class ETL:
+class IndexWorker:
     """
-    A class that performs an ETL process by extracting data from Postgres, transforming it,
-    and loading it into Elasticsearch.
+    A class that performs an ETL process for a single index by extracting data from Postgres,
+    transforming it, and loading it into Elasticsearch. Every worker owns its connections,
+    so several workers can run concurrently. With a hash store, documents whose content
+    has not changed since they were last loaded are not sent to Elasticsearch again.
     """
 
-    def __init__(self):
-        self.psql = PostgresExtractor(dsn=pg_config.dsn, all_queries=ALL_SQL_QUERIES)
+    def __init__(
+        self,
+        index_name: str,
+        state: State,
+        hash_store: Optional[HashStore] = None,
+        api_cache: Optional[ApiCacheInvalidator] = None,
+    ):
+        self.index_name = index_name
+        self.psql = PostgresExtractor(
+            dsn=pg_config.dsn,
+            all_queries=ALL_SQL_QUERIES,
+            count_queries=ALL_COUNT_SQL_QUERIES,
+        )
         self.es = ElasticsearchLoader(es_url=es_config.url)
         self.transform = DataTransformer()
-        self.state = State(JsonFileStorage(settings_config.STATE_FILE_NAME))
+        self.state = state
+        self.hash_store = hash_store
+        self.api_cache = api_cache
+
+    def load_all_data(self, target_index: Optional[str] = None) -> None:
+        """
+        Load data from Postgres to Elasticsearch. When `target_index` is given, all rows are
+        loaded into it, bypassing the content hash check, and the checkpoint is left
+        untouched, which is used by full reindexes.
+        Large incremental backfills are loaded with the bulk-load index settings. The
+        checkpoint is committed once the whole pass has been loaded.
+        """
+
+        index_name = self.index_name
+        started_at = datetime.now(timezone.utc).isoformat()
+        stats = CycleStats(index_name)
+        if target_index:
+            last_state = datetime.min
+            load_profile = nullcontext()
+        else:
+            last_state = (
+                self.state.get_state(f'{index_name}_updated_at') or datetime.min
+            )
+            pending = self.psql.get_pending_count(last_state, index_name)
+            stats.set_pending(pending)
+            if pending >= settings_config.BULK_LOAD_THRESHOLD:
+                logger.info(
+                    '{} rows of index "{}" are pending, loading them as a backfill',
+                    pending,
+                    index_name,
+                )
+                load_profile = self.es.bulk_load_profile(index_name)
+            else:
+                load_profile = nullcontext()
+        try:
+            with load_profile:
+                for movies_data in stats.extract(
+                    self.psql.get_movies_data(last_state, index_name)
+                ):
+                    if target_index:
+                        self.transfer(movies_data, target_index, stats)
+                    else:
+                        self.transfer(movies_data, index_name, stats, self.hash_store)
+            if not target_index:
+                self.state.set_state(f'{index_name}_updated_at', started_at)
+                self.state.commit()
+            stats.finish()
+        except Exception as e:
+            logger.error(
+                'An error occurred while transferring data of index "{}". Error: {}.',
+                index_name,
+                e,
+            )
+            raise
+
+    def transfer(
+        self,
+        rows: list[dict],
+        target_index: str,
+        stats: CycleStats,
+        hash_store: Optional[HashStore] = None,
+    ) -> list[dict]:
+        """
+        Transforms a chunk of rows and loads the documents into the target index. The API
+        cache entries built from the documents are dropped afterwards.
+        """
+
+        with stats.stage('transform'):
+            documents = self.transform.transform_movies_data(rows, self.index_name)
+        stats.add_rows('transform', len(documents))
+        previous_documents = self.get_indexed_documents(
+            [str(document['id']) for document in documents], target_index
+        )
+        with stats.stage('load'):
+            result = self.es.load_movies_data(documents, target_index, hash_store)
+        stats.loaded(rows, result)
+        if self.api_cache is not None:
+            self.api_cache.invalidate(documents + previous_documents, self.index_name)
+        return documents
 
-    def load_all_data(self, index_name: str) -> None:
+    def get_indexed_documents(self, ids: list[str], index_name: str) -> list[dict]:
         """
-        Load data from Postgres to Elasticsearch
+        Returns the indexed documents the API cache was built from, before they are replaced.
+        """
+
+        if self.api_cache is None or self.index_name not in SOURCE_FIELDS:
+            return []
+        return self.es.get_documents(ids, index_name, SOURCE_FIELDS[self.index_name])
+
+    def create_index(self) -> None:
+        """
+        Creates the index if it does not exist. The hashes of a new index are cleared,
+        since none of its documents has been loaded yet.
+        """
+
+        if self.es.create_index(self.index_name) and self.hash_store is not None:
+            self.hash_store.clear()
+
+    def run_cycle(self) -> None:
+        """
+        Run a single ETL pass for the index.
         """
 
-        last_state = self.state.get_state(f'{index_name}_updated_at') or datetime.min
-        count = 0
         try:
-            for movies_data in self.psql.get_movies_data(last_state, index_name):
-                self.state.set_state(
-                    f'{index_name}_updated_at', datetime.now(timezone.utc).isoformat()
+            self.state.reload()
+            self.psql.connect_to_postgres()
+            self.es.connect_to_elastic()
+            self.create_index()
+            self.load_all_data()
+        except Exception as e:
+            logger.error(
+                'An error occurred during ETL process of index "{}". Error: {}.',
+                self.index_name,
+                e,
+            )
+        finally:
+            self.psql.close()
+
+    def apply_changes(self, changes: Changes) -> None:
+        """
+        Reindex the documents affected by a batch of change notifications and delete the ones
+        whose rows no longer exist.
+        """
+
+        ids = set(changes.index_ids[self.index_name])
+        try:
+            self.psql.connect_to_postgres()
+            if self.index_name == 'movies':
+                ids |= self.psql.get_related_movie_ids(
+                    list(changes.movies_by_person_ids),
+                    list(changes.movies_by_genre_ids),
                 )
-                es_movies = self.transform.transform_movies_data(
-                    movies_data, index_name
+            if not ids:
+                return
+            stats = CycleStats(self.index_name)
+            stats.set_pending(len(ids))
+            self.es.connect_to_elastic()
+            self.create_index()
+            loaded_ids = set()
+            for rows in stats.extract(
+                self.psql.get_data_by_ids(list(ids), self.index_name)
+            ):
+                es_data = self.transfer(rows, self.index_name, stats, self.hash_store)
+                loaded_ids.update(str(document['id']) for document in es_data)
+            if deleted_ids := ids - loaded_ids:
+                deleted_documents = self.get_indexed_documents(
+                    list(deleted_ids), self.index_name
                 )
-                self.es.load_movies_data(es_movies, index_name),
-                count += len(es_movies)
-            logger.info(
-                'Successfully transferred {} documents to Elasticsearch.', count
-            )
+                self.es.delete_documents(
+                    list(deleted_ids), self.index_name, self.hash_store
+                )
+                if self.api_cache is not None:
+                    self.api_cache.invalidate(deleted_documents, self.index_name)
+            stats.finish()
         except Exception as e:
-            logger.error('An error occurred while transferring data. Error: {}.', e)
-            raise
+            logger.error(
+                'An error occurred while applying changes to index "{}". Error: {}.',
+                self.index_name,
+                e,
+            )
+        finally:
+            self.psql.close()
+
+    def reindex(self) -> None:
+        """
+        Rebuild the index from scratch into a new version and swap the alias to it once it is
+        complete. The checkpoint is reset to the start of the rebuild, so changes made while it
+        was running are picked up by the next regular pass.
+        """
+
+        started_at = datetime.now(timezone.utc).isoformat()
+        try:
+            self.psql.connect_to_postgres()
+            self.es.connect_to_elastic()
+            versioned_index = self.es.create_versioned_index(self.index_name)
+            self.load_all_data(target_index=versioned_index)
+            self.es.publish_index(self.index_name, versioned_index)
+            if self.hash_store is not None:
+                # The rebuilt index may miss documents loaded into the previous version.
+                self.hash_store.clear()
+            self.state.set_state(f'{self.index_name}_updated_at', started_at)
+            self.state.commit()
+        finally:
+            self.psql.close()
+
+
+class ETL:
+    """
+    A class that schedules the index workers, at most `MAX_WORKERS` at a time.
+
+    In `polling` mode every index is processed independently of the others and is run again
+    `FREQUENCY` seconds after its previous pass has finished. In `listen` mode the workers
+    apply batches of changes received from PostgreSQL notifications, and run a regular pass
+    whenever no change arrived for `FREQUENCY` seconds. If listening fails, the ETL falls back
+    to polling.
+    """
+
+    def __init__(self):
+        self.redis = Redis(host=redis_config.HOST, port=redis_config.PORT)
+        self.state = State(self.get_storage())
+        self.workers = {
+            index_name: IndexWorker(
+                index_name,
+                self.state,
+                self.get_hash_store(index_name),
+                self.get_api_cache(),
+            )
+            for index_name in ALL_INDEXES
+        }
+
+    def get_storage(self) -> BaseStorage:
+        if settings_config.STATE_STORAGE == 'redis':
+            return RedisStorage(self.redis)
+        return JsonFileStorage(settings_config.STATE_FILE_NAME)
+
+    def get_hash_store(self, index_name: str) -> Optional[HashStore]:
+        if settings_config.HASH_STORE == 'redis':
+            return RedisHashStore(
+                self.redis, f'{settings_config.HASH_STORE_REDIS_KEY}:{index_name}'
+            )
+        if settings_config.HASH_STORE == 'file':
+            return DbmHashStore(f'{settings_config.HASH_STORE_FILE_NAME}_{index_name}')
+        return None
+
+    def get_api_cache(self) -> Optional[ApiCacheInvalidator]:
+        if settings_config.API_CACHE_INVALIDATION:
+            return ApiCacheInvalidator(
+                self.redis, settings_config.PERSON_FILMS_CACHE_KEY
+            )
+        return None
 
     def run(self):
-        while True:
+        if settings_config.METRICS_PORT:
+            start_metrics_server(settings_config.METRICS_PORT)
+        if settings_config.ETL_MODE == 'listen':
             try:
-                self.psql.connect_to_postgres()
-                self.es.connect_to_elastic()
-                for index_name in ALL_INDEXES:
-                    self.es.create_index(index_name)
-                    self.load_all_data(index_name)
-            except Exception as e:
-                logger.error('An error occurred during ETL process. Error: {}.', e)
-            finally:
-                self.psql.cursor.close()
-                self.psql.connection.close()
-                time.sleep(settings_config.FREQUENCY)
+                self.listen()
+            except DatabaseError as e:
+                logger.error(
+                    'Listening to changes failed, falling back to polling. Error: {}.',
+                    e,
+                )
+        self.poll()
+
+    def listen(self):
+        listener = ChangeListener(dsn=pg_config.dsn)
+        listener.connect()
+        try:
+            with ThreadPoolExecutor(
+                max_workers=settings_config.MAX_WORKERS, thread_name_prefix='etl'
+            ) as executor:
+                # Catch up with the changes made while nobody was listening.
+                tasks = [worker.run_cycle for worker in self.workers.values()]
+                while True:
+                    wait([executor.submit(task) for task in tasks])
+                    changes = listener.collect(timeout=settings_config.FREQUENCY)
+                    if changes is None:
+                        tasks = [worker.run_cycle for worker in self.workers.values()]
+                    else:
+                        tasks = [
+                            partial(worker.apply_changes, changes)
+                            for worker in self.workers.values()
+                        ]
+        finally:
+            listener.close()
+
+    def poll(self):
+        next_runs = {index_name: time.monotonic() for index_name in self.workers}
+        running: dict[str, Future] = {}
+        with ThreadPoolExecutor(
+            max_workers=settings_config.MAX_WORKERS, thread_name_prefix='etl'
+        ) as executor:
+            while True:
+                now = time.monotonic()
+                for index_name, worker in self.workers.items():
+                    if index_name not in running and next_runs[index_name] <= now:
+                        running[index_name] = executor.submit(worker.run_cycle)
+
+                idle_runs = [
+                    next_run
+                    for index_name, next_run in next_runs.items()
+                    if index_name not in running
+                ]
+                timeout = (
+                    max(min(idle_runs) - time.monotonic(), 0) if idle_runs else None
+                )
+                if running:
+                    wait(running.values(), timeout=timeout, return_when=FIRST_COMPLETED)
+                else:
+                    time.sleep(timeout)
+
+                for index_name, future in list(running.items()):
+                    if future.done():
+                        del running[index_name]
+                        next_runs[index_name] = (
+                            time.monotonic() + settings_config.FREQUENCY
+                        )
+
+    def reindex(self, index_names: list[str]) -> None:
+        for index_name in index_names:
+            logger.info('Starting a full reindex of "{}"', index_name)
+            self.workers[index_name].reindex()
 
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Movies ETL')
+    parser.add_argument(
+        '--reindex',
+        nargs='*',
+        choices=list(ALL_INDEXES),
+        help='Rebuild the given indices (all if none given) without downtime and exit',
+    )
+    args = parser.parse_args()
+
     etl = ETL()
-    etl.run()
+    if args.reindex is not None:
+        etl.reindex(args.reindex or list(ALL_INDEXES))
+    else:
+        etl.run()
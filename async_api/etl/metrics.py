@@ -0,0 +1,164 @@
+import time
+
+from collections import defaultdict
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Generator, Iterable, Iterator
+
+from configs import loguru_config
+from load import LoadResult
+from loguru import logger
+from prometheus_client import Counter, Gauge, Histogram, start_http_server
+
+logger.add(**loguru_config)
+
+STAGES = ('extract', 'transform', 'load')
+
+STAGE_DURATION = Histogram(
+    'etl_stage_duration_seconds',
+    'Time spent in an ETL stage per chunk.',
+    ['index', 'stage'],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60),
+)
+STAGE_ROWS = Counter(
+    'etl_stage_rows_total', 'Rows passed through an ETL stage.', ['index', 'stage']
+)
+STAGE_ERRORS = Counter(
+    'etl_stage_errors_total', 'Errors raised in an ETL stage.', ['index', 'stage']
+)
+SKIPPED_DOCUMENTS = Counter(
+    'etl_skipped_documents_total',
+    'Documents not sent to Elasticsearch because their content has not changed.',
+    ['index'],
+)
+LOADED_BYTES = Counter(
+    'etl_loaded_bytes_total', 'Bytes of documents sent to Elasticsearch.', ['index']
+)
+PENDING_ROWS = Gauge(
+    'etl_pending_rows', 'Rows changed in PostgreSQL and not indexed yet.', ['index']
+)
+INDEXING_LAG = Gauge(
+    'etl_indexing_lag_seconds',
+    'Time between the last update of the latest loaded row and its indexing.',
+    ['index'],
+)
+LAST_SUCCESS = Gauge(
+    'etl_last_success_timestamp_seconds',
+    'Time the last successful ETL pass has finished.',
+    ['index'],
+)
+
+
+def start_metrics_server(port: int) -> None:
+    """
+    Starts the HTTP exporter of the Prometheus metrics in a background thread.
+    """
+
+    start_http_server(port)
+    logger.info('Serving Prometheus metrics on port {}', port)
+
+
+class CycleStats:
+    """
+    A class that measures a single ETL pass of an index: it feeds the Prometheus metrics
+    and summarizes the pass in the log once it is over.
+    """
+
+    def __init__(self, index_name: str):
+        self.index_name = index_name
+        self.started_at = time.perf_counter()
+        self.seconds = defaultdict(float)
+        self.rows = defaultdict(int)
+        self.bytes = 0
+        self.skipped = 0
+        self.pending = 0
+
+    @contextmanager
+    def stage(self, stage: str) -> Iterator[None]:
+        """
+        Measures the time spent in the stage and counts the errors raised in it.
+        """
+
+        started_at = time.perf_counter()
+        try:
+            yield
+        except Exception:
+            STAGE_ERRORS.labels(self.index_name, stage).inc()
+            raise
+        finally:
+            elapsed = time.perf_counter() - started_at
+            self.seconds[stage] += elapsed
+            STAGE_DURATION.labels(self.index_name, stage).observe(elapsed)
+
+    def extract(self, chunks: Iterable[list[dict]]) -> Generator:
+        """
+        Yields the extracted chunks, measuring the time spent fetching each of them.
+        """
+
+        iterator = iter(chunks)
+        while True:
+            with self.stage('extract'):
+                rows = next(iterator, None)
+            if rows is None:
+                return
+            self.add_rows('extract', len(rows))
+            yield rows
+
+    def add_rows(self, stage: str, count: int) -> None:
+        self.rows[stage] += count
+        STAGE_ROWS.labels(self.index_name, stage).inc(count)
+
+    def set_pending(self, count: int) -> None:
+        self.pending = count
+        PENDING_ROWS.labels(self.index_name).set(count)
+
+    def loaded(self, rows: list[dict], result: LoadResult) -> None:
+        """
+        Accounts for a loaded chunk of documents built from `rows`.
+        """
+
+        self.add_rows('load', result.loaded)
+        self.skipped += result.skipped
+        SKIPPED_DOCUMENTS.labels(self.index_name).inc(result.skipped)
+        self.bytes += result.size
+        LOADED_BYTES.labels(self.index_name).inc(result.size)
+        if self.pending:
+            self.set_pending(max(self.pending - len(rows), 0))
+        updated_at = max(
+            (row['updated_at'] for row in rows if row.get('updated_at')), default=None
+        )
+        if updated_at is not None:
+            if updated_at.tzinfo is None:
+                updated_at = updated_at.replace(tzinfo=timezone.utc)
+            lag = (datetime.now(timezone.utc) - updated_at).total_seconds()
+            INDEXING_LAG.labels(self.index_name).set(max(lag, 0))
+
+    def finish(self) -> None:
+        """
+        Marks the pass as successful and logs its summary.
+        """
+
+        LAST_SUCCESS.labels(self.index_name).set_to_current_time()
+        self.set_pending(0)
+        elapsed = time.perf_counter() - self.started_at
+        stages = ', '.join(
+            '{}: {} rows in {:.2f}s ({:.0f} rows/s)'.format(
+                stage,
+                self.rows[stage],
+                self.seconds[stage],
+                self.rows[stage] / self.seconds[stage] if self.seconds[stage] else 0,
+            )
+            for stage in STAGES
+        )
+        documents = self.rows['load'] + self.skipped
+        logger.info(
+            'ETL pass of index "{}" took {:.2f}s, {}, {} unchanged documents skipped '
+            '({:.0%}), {:.1f} KiB loaded ({:.1f} KiB/s)',
+            self.index_name,
+            elapsed,
+            stages,
+            self.skipped,
+            self.skipped / documents if documents else 0,
+            self.bytes / 1024,
+            self.bytes / 1024 / elapsed if elapsed else 0,
+        )
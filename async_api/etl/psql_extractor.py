@@ -8,20 +8,38 @@ from configs import loguru_config, settings_config
 from loguru import logger
 from psycopg2 import DatabaseError, OperationalError, ProgrammingError
 from psycopg2.extras import RealDictCursor
+from sql_queries import (
+    ALL_BY_IDS_SQL_QUERIES,
+    FILM_WORK_BATCH_SQL_QUERY,
+    FILM_WORK_GENRES_SQL_QUERY,
+    FILM_WORK_PERSONS_SQL_QUERY,
+    MOVIE_IDS_BY_GENRES_SQL_QUERY,
+    MOVIE_IDS_BY_PERSONS_SQL_QUERY,
+)
 
 logger.add(**loguru_config)
 
+MAX_UUID = 'ffffffff-ffff-ffff-ffff-ffffffffffff'
+
 
 class PostgresExtractor:
     """
     A class that extracts data from a Postgres database using a provided SQL query.
     """
 
-    def __init__(self, dsn: str, all_queries: dict[str]):
+    def __init__(
+        self,
+        dsn: str,
+        all_queries: dict[str],
+        count_queries: dict[str] = None,
+        movies_strategy: str = settings_config.MOVIES_EXTRACT_STRATEGY,
+    ):
         self.cursor = None
         self.connection = None
         self.dsn = dsn
         self.all_queries = all_queries
+        self.count_queries = count_queries or {}
+        self.movies_strategy = movies_strategy
 
     @on_exception(
         expo, OperationalError, max_tries=settings_config.MAX_TRIES, logger=logger
@@ -36,6 +54,34 @@ class PostgresExtractor:
         self.cursor = self.connection.cursor()
         logger.info('The connection with PostgreSQL has been established')
 
+    def close(self) -> None:
+        """
+        Closes the cursor and the connection to PostgreSQL if they are open.
+        """
+
+        if self.cursor is not None:
+            self.cursor.close()
+            self.cursor = None
+        if self.connection is not None:
+            self.connection.close()
+            self.connection = None
+
+    @on_exception(
+        expo,
+        (DatabaseError, ProgrammingError),
+        max_tries=settings_config.MAX_TRIES,
+        logger=logger,
+    )
+    def get_pending_count(self, latest_updated_at: datetime, index_name: str) -> int:
+        """
+        Returns the number of rows of the index changed since the provided timestamp.
+        """
+
+        self.cursor.execute(
+            query=self.count_queries[index_name], vars=(latest_updated_at,)
+        )
+        return self.cursor.fetchone()['count']
+
     @on_exception(
         expo,
         (DatabaseError, ProgrammingError),
@@ -52,6 +98,10 @@ class PostgresExtractor:
         Retrieves movies data from PostgreSQL using the provided SQL query.
         """
 
+        if index_name == 'movies' and self.movies_strategy == 'flat':
+            yield from self.get_flat_movies_data(latest_updated_at, chunk_size)
+            return
+
         self.cursor.execute(
             query=self.all_queries[index_name], vars=(latest_updated_at,)
         )
@@ -63,3 +113,97 @@ class PostgresExtractor:
             if not rows:
                 break
             yield rows
+
+    def get_flat_movies_data(
+        self,
+        latest_updated_at: datetime,
+        chunk_size: int = settings_config.CHUNK_SIZE,
+    ) -> Generator:
+        """
+        Retrieves movies data with flat queries instead of aggregating it in PostgreSQL.
+        Film works are read in keyset batches ordered by `(updated_at, id)`; their persons and
+        genres are fetched by the ids of the batch and grouped in Python. The rows have the
+        same shape as the rows of `MOVIE_SQL_QUERY`.
+        """
+
+        last_updated_at, last_id = latest_updated_at, MAX_UUID
+        while True:
+            self.cursor.execute(
+                query=FILM_WORK_BATCH_SQL_QUERY,
+                vars=(last_updated_at, last_id, chunk_size),
+            )
+            rows = self.cursor.fetchall()
+            logger.info('Fetched {} rows of index "movies" from PostgreSQL', len(rows))
+            if not rows:
+                break
+
+            movies = {
+                row['id']: {**row, 'all_persons': [], 'all_genres': []} for row in rows
+            }
+            film_work_ids = list(movies)
+
+            self.cursor.execute(
+                query=FILM_WORK_PERSONS_SQL_QUERY, vars=(film_work_ids,)
+            )
+            for link in self.cursor.fetchall():
+                movies[link['film_work_id']]['all_persons'].append(
+                    {
+                        'role': link['role'],
+                        'id': link['id'],
+                        'full_name': link['full_name'],
+                    }
+                )
+
+            self.cursor.execute(query=FILM_WORK_GENRES_SQL_QUERY, vars=(film_work_ids,))
+            for link in self.cursor.fetchall():
+                movies[link['film_work_id']]['all_genres'].append(
+                    {
+                        'id': link['id'],
+                        'name': link['name'],
+                        'description': link['description'],
+                    }
+                )
+
+            yield list(movies.values())
+            last_updated_at, last_id = rows[-1]['updated_at'], rows[-1]['id']
+
+    def get_data_by_ids(
+        self,
+        ids: list[str],
+        index_name: str,
+        chunk_size: int = settings_config.CHUNK_SIZE,
+    ) -> Generator:
+        """
+        Retrieves the rows of the index with the provided ids in chunks.
+        Ids without a row (deleted ones) are simply absent from the result.
+        """
+
+        for start in range(0, len(ids), chunk_size):
+            chunk_ids = ids[start : start + chunk_size]
+            self.cursor.execute(
+                query=ALL_BY_IDS_SQL_QUERIES[index_name], vars=(chunk_ids,)
+            )
+            rows = self.cursor.fetchall()
+            logger.info(
+                'Fetched {} rows of index "{}" from PostgreSQL by id',
+                len(rows),
+                index_name,
+            )
+            yield rows
+
+    def get_related_movie_ids(
+        self, person_ids: list[str], genre_ids: list[str]
+    ) -> set[str]:
+        """
+        Returns the ids of the movies the provided persons and genres appear in.
+        """
+
+        movie_ids = set()
+        for query, ids in (
+            (MOVIE_IDS_BY_PERSONS_SQL_QUERY, person_ids),
+            (MOVIE_IDS_BY_GENRES_SQL_QUERY, genre_ids),
+        ):
+            if ids:
+                self.cursor.execute(query=query, vars=(ids,))
+                movie_ids.update(str(row['id']) for row in self.cursor.fetchall())
+        return movie_ids
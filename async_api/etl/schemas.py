@@ -1,5 +1,5 @@
 from datetime import date
-from typing import Optional
+from typing import Literal, Optional
 from uuid import UUID
 
 from pydantic import BaseModel, Field, PostgresDsn
@@ -44,12 +44,39 @@ class ElasticsearchConfig(BaseSettings):
         return f'{self.HOST}:{self.PORT}'
 
 
+class RedisConfig(BaseSettings):
+    HOST: str = Field('localhost')
+    PORT: int = Field(6379)
+
+    class Config:
+        env_prefix = 'REDIS_'
+
+
 class CustomSettings(BaseSettings):
     CHUNK_SIZE: int = Field(200)
     FREQUENCY: int = Field(60)
     STATE_FILE_NAME: str = Field('movies_state.json')
+    STATE_STORAGE: Literal['json', 'redis'] = Field('json')
+    STATE_REDIS_KEY: str = Field('etl_state')
+    HASH_STORE: Literal['off', 'file', 'redis'] = Field('file')
+    HASH_STORE_FILE_NAME: str = Field('document_hashes')
+    HASH_STORE_REDIS_KEY: str = Field('etl_hashes')
+    API_CACHE_INVALIDATION: bool = Field(True)
+    PERSON_FILMS_CACHE_KEY: str = Field('person_films')
     INDEX_NAME: str = Field('movies')
-    MAX_TRIES = int = Field(5)
+    MAX_TRIES: int = Field(5)
+    MAX_WORKERS: int = Field(3)
+    KEEP_INDEX_VERSIONS: int = Field(2)
+    BULK_LOAD_THRESHOLD: int = Field(10000)
+    TRANSFORM_VALIDATION: Literal['strict', 'sampled', 'off'] = Field('sampled')
+    VALIDATION_SAMPLE_RATE: float = Field(0.01, ge=0, le=1)
+    MOVIES_EXTRACT_STRATEGY: Literal['aggregate', 'flat'] = Field('aggregate')
+    ETL_MODE: Literal['polling', 'listen'] = Field('polling')
+    CDC_INSTALL_TRIGGERS: bool = Field(True)
+    CDC_DEBOUNCE: float = Field(1.0)
+    CDC_MAX_DELAY: float = Field(10.0)
+    CDC_MAX_BATCH: int = Field(10000)
+    METRICS_PORT: int = Field(9100)
 
 
 class ShortPersonData(BaseModel):
@@ -80,6 +107,10 @@ class MovieData(BaseModel):
     directors_names: list[str] = []
     actors_names: list[str] = []
     writers_names: list[str] = []
+    genre_ids: list[UUID] = []
+    director_ids: list[UUID] = []
+    actor_ids: list[UUID] = []
+    writer_ids: list[UUID] = []
     directors: list[ShortPersonData] = []
     actors: list[ShortPersonData] = []
     writers: list[ShortPersonData] = []
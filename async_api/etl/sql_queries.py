@@ -1,4 +1,4 @@
-MOVIE_SQL_QUERY = """
+MOVIE_SQL_TEMPLATE = """
     SELECT
         film_work.id,
         film_work.title,
@@ -28,21 +28,21 @@ MOVIE_SQL_QUERY = """
     LEFT JOIN content.person ON person.id = person_film_work.person_id
     LEFT JOIN content.genre_film_work ON genre_film_work.film_work_id = film_work.id
     LEFT JOIN content.genre ON genre.id = genre_film_work.genre_id
-    WHERE film_work.updated_at > %s
+    WHERE {condition}
     GROUP BY film_work.id
 """
 
-GENRE_SQL_QUERY = """
+GENRE_SQL_TEMPLATE = """
     SELECT
         genre.id,
         genre.name,
         genre.description,
         genre.updated_at
     FROM content.genre
-    WHERE genre.updated_at > %s;
+    WHERE {condition};
 """
 
-PERSON_SQL_QUERY = """
+PERSON_SQL_TEMPLATE = """
     SELECT
         person.id,
         person.full_name,
@@ -59,12 +59,153 @@ PERSON_SQL_QUERY = """
     FROM content.person
     LEFT JOIN content.person_film_work ON person_film_work.person_id = person.id
     LEFT JOIN content.film_work ON film_work.id = person_film_work.film_work_id
-    WHERE person.updated_at > %s
+    WHERE {condition}
     GROUP BY person.id
 """
 
+FILM_WORK_BATCH_SQL_QUERY = """
+    SELECT
+        film_work.id,
+        film_work.title,
+        film_work.description,
+        film_work.rating,
+        film_work.type,
+        film_work.created_at,
+        film_work.updated_at,
+        film_work.creation_date,
+        film_work.file_path
+    FROM content.film_work
+    WHERE (film_work.updated_at, film_work.id) > (%s, %s)
+    ORDER BY film_work.updated_at, film_work.id
+    LIMIT %s;
+"""
+
+FILM_WORK_PERSONS_SQL_QUERY = """
+    SELECT
+        person_film_work.film_work_id,
+        person_film_work.role,
+        person.id,
+        person.full_name
+    FROM content.person_film_work
+    JOIN content.person ON person.id = person_film_work.person_id
+    WHERE person_film_work.film_work_id = ANY(%s::uuid[])
+    ORDER BY person_film_work.film_work_id, person.id, person_film_work.role;
+"""
+
+FILM_WORK_GENRES_SQL_QUERY = """
+    SELECT
+        genre_film_work.film_work_id,
+        genre.id,
+        genre.name,
+        genre.description
+    FROM content.genre_film_work
+    JOIN content.genre ON genre.id = genre_film_work.genre_id
+    WHERE genre_film_work.film_work_id = ANY(%s::uuid[])
+    ORDER BY genre_film_work.film_work_id, genre.id;
+"""
+
+MOVIE_SQL_QUERY = MOVIE_SQL_TEMPLATE.format(condition='film_work.updated_at > %s')
+GENRE_SQL_QUERY = GENRE_SQL_TEMPLATE.format(condition='genre.updated_at > %s')
+PERSON_SQL_QUERY = PERSON_SQL_TEMPLATE.format(condition='person.updated_at > %s')
+
+MOVIE_BY_IDS_SQL_QUERY = MOVIE_SQL_TEMPLATE.format(
+    condition='film_work.id = ANY(%s::uuid[])'
+)
+GENRE_BY_IDS_SQL_QUERY = GENRE_SQL_TEMPLATE.format(
+    condition='genre.id = ANY(%s::uuid[])'
+)
+PERSON_BY_IDS_SQL_QUERY = PERSON_SQL_TEMPLATE.format(
+    condition='person.id = ANY(%s::uuid[])'
+)
+
 ALL_SQL_QUERIES = {
     'movies': MOVIE_SQL_QUERY,
     'genres': GENRE_SQL_QUERY,
     'persons': PERSON_SQL_QUERY,
 }
+
+MOVIE_COUNT_SQL_QUERY = """
+    SELECT COUNT(*) AS count
+    FROM content.film_work
+    WHERE film_work.updated_at > %s;
+"""
+
+GENRE_COUNT_SQL_QUERY = """
+    SELECT COUNT(*) AS count
+    FROM content.genre
+    WHERE genre.updated_at > %s;
+"""
+
+PERSON_COUNT_SQL_QUERY = """
+    SELECT COUNT(*) AS count
+    FROM content.person
+    WHERE person.updated_at > %s;
+"""
+
+ALL_COUNT_SQL_QUERIES = {
+    'movies': MOVIE_COUNT_SQL_QUERY,
+    'genres': GENRE_COUNT_SQL_QUERY,
+    'persons': PERSON_COUNT_SQL_QUERY,
+}
+
+ALL_BY_IDS_SQL_QUERIES = {
+    'movies': MOVIE_BY_IDS_SQL_QUERY,
+    'genres': GENRE_BY_IDS_SQL_QUERY,
+    'persons': PERSON_BY_IDS_SQL_QUERY,
+}
+
+MOVIE_IDS_BY_PERSONS_SQL_QUERY = """
+    SELECT DISTINCT person_film_work.film_work_id AS id
+    FROM content.person_film_work
+    WHERE person_film_work.person_id = ANY(%s::uuid[]);
+"""
+
+MOVIE_IDS_BY_GENRES_SQL_QUERY = """
+    SELECT DISTINCT genre_film_work.film_work_id AS id
+    FROM content.genre_film_work
+    WHERE genre_film_work.genre_id = ANY(%s::uuid[]);
+"""
+
+CHANGES_CHANNEL = 'etl_changes'
+
+NOTIFY_TRIGGERS_SQL = f"""
+    CREATE OR REPLACE FUNCTION content.notify_etl_change() RETURNS trigger AS $$
+    DECLARE
+        row_data jsonb;
+    BEGIN
+        IF TG_OP = 'DELETE' THEN
+            row_data := to_jsonb(OLD);
+        ELSE
+            row_data := to_jsonb(NEW);
+        END IF;
+        PERFORM pg_notify('{CHANGES_CHANNEL}', json_build_object(
+            'table', TG_TABLE_NAME,
+            'id', row_data->>'id',
+            'film_work_id', row_data->>'film_work_id',
+            'person_id', row_data->>'person_id',
+            'genre_id', row_data->>'genre_id'
+        )::text);
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql;
+
+    CREATE OR REPLACE TRIGGER film_work_etl_change
+    AFTER INSERT OR UPDATE OR DELETE ON content.film_work
+    FOR EACH ROW EXECUTE FUNCTION content.notify_etl_change();
+
+    CREATE OR REPLACE TRIGGER person_etl_change
+    AFTER INSERT OR UPDATE OR DELETE ON content.person
+    FOR EACH ROW EXECUTE FUNCTION content.notify_etl_change();
+
+    CREATE OR REPLACE TRIGGER genre_etl_change
+    AFTER INSERT OR UPDATE OR DELETE ON content.genre
+    FOR EACH ROW EXECUTE FUNCTION content.notify_etl_change();
+
+    CREATE OR REPLACE TRIGGER person_film_work_etl_change
+    AFTER INSERT OR UPDATE OR DELETE ON content.person_film_work
+    FOR EACH ROW EXECUTE FUNCTION content.notify_etl_change();
+
+    CREATE OR REPLACE TRIGGER genre_film_work_etl_change
+    AFTER INSERT OR UPDATE OR DELETE ON content.genre_film_work
+    FOR EACH ROW EXECUTE FUNCTION content.notify_etl_change();
+"""
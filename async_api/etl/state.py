@@ -1,10 +1,15 @@
 import abc
 import json
+import os
+import tempfile
+import threading
 
 from typing import Any, Optional
 
-from configs import loguru_config
+from backoff import expo, on_exception
+from configs import loguru_config, settings_config
 from loguru import logger
+from redis import ConnectionError, Redis
 
 logger.add(**loguru_config)
 
@@ -12,6 +17,9 @@ logger.add(**loguru_config)
 class BaseStorage:
     @abc.abstractmethod
     def save_state(self, state: dict) -> None:
+        """
+        Persists the provided keys, keeping the other stored keys intact.
+        """
         pass
 
     @abc.abstractmethod
@@ -22,42 +30,123 @@ class BaseStorage:
 class JsonFileStorage(BaseStorage):
     """
     A class that provides methods for saving and retrieving data in a JSON file format.
+    The file is replaced atomically, so a crash never leaves a partially written state.
     """
 
     def __init__(self, file_path: Optional[str] = None):
         self.file_path = file_path
 
     def save_state(self, state: dict) -> None:
+        stored_state = self.retrieve_state()
+        stored_state.update(state)
+        directory = os.path.dirname(os.path.abspath(self.file_path))
         try:
-            with open(self.file_path, 'w') as f:
-                json.dump(state, f)
+            fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
         except FileNotFoundError as e:
             logger.error('The file {} has not been found. Error: {}', self.file_path, e)
+            return
+        try:
+            with os.fdopen(fd, 'w') as f:
+                json.dump(stored_state, f)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.file_path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+        dir_fd = os.open(directory, os.O_RDONLY)
+        try:
+            os.fsync(dir_fd)
+        finally:
+            os.close(dir_fd)
 
     def retrieve_state(self) -> dict:
         state = {}
         try:
             with open(self.file_path, 'r') as f:
                 state = json.load(f)
-        except FileNotFoundError as e:
-            logger.error('The file {} has not been found. Error: {}', self.file_path, e)
+        except FileNotFoundError:
+            logger.info('The state file {} does not exist yet', self.file_path)
+        except json.JSONDecodeError as e:
+            logger.error('The state file {} is corrupted. Error: {}', self.file_path, e)
         return state
 
 
+class RedisStorage(BaseStorage):
+    """
+    A class that keeps the state in a Redis hash, so several ETL processes can share it.
+    """
+
+    def __init__(self, redis: Redis, key: str = settings_config.STATE_REDIS_KEY):
+        self.redis = redis
+        self.key = key
+
+    @on_exception(
+        expo, ConnectionError, max_tries=settings_config.MAX_TRIES, logger=logger
+    )
+    def save_state(self, state: dict) -> None:
+        if state:
+            self.redis.hset(
+                self.key,
+                mapping={key: json.dumps(value) for key, value in state.items()},
+            )
+
+    @on_exception(
+        expo, ConnectionError, max_tries=settings_config.MAX_TRIES, logger=logger
+    )
+    def retrieve_state(self) -> dict:
+        return {
+            key.decode(): json.loads(value)
+            for key, value in self.redis.hgetall(self.key).items()
+        }
+
+
 class State:
     """
     A class that manages application state by delegating data persistence to a storage object.
+
+    Reads are served from memory: the storage is read on first use and on `reload`. Changes
+    are kept in memory until `commit`, which persists only the changed keys. The state is safe
+    to share between ETL workers as long as every worker keeps its own keys.
     """
 
     def __init__(self, storage: BaseStorage):
         self.storage = storage
-        self.state = {}
+        self.state = None
+        self.changed_keys = set()
+        self.lock = threading.Lock()
+
+    def reload(self) -> None:
+        """
+        Re-reads the storage, keeping the uncommitted changes.
+        """
+
+        with self.lock:
+            stored_state = self.storage.retrieve_state()
+            for key in self.changed_keys:
+                stored_state[key] = self.state[key]
+            self.state = stored_state
 
     def set_state(self, key: str, value: Any) -> None:
-        if self.state is not None:
+        with self.lock:
+            if self.state is None:
+                self.state = self.storage.retrieve_state()
             self.state[key] = value
-            self.storage.save_state(self.state)
+            self.changed_keys.add(key)
 
     def get_state(self, key: str) -> Any:
-        self.state = self.storage.retrieve_state()
-        return self.state.get(key)
+        with self.lock:
+            if self.state is None:
+                self.state = self.storage.retrieve_state()
+            return self.state.get(key)
+
+    def commit(self) -> None:
+        """
+        Persists the keys changed since the last commit.
+        """
+
+        with self.lock:
+            if not self.changed_keys:
+                return
+            self.storage.save_state({key: self.state[key] for key in self.changed_keys})
+            self.changed_keys.clear()
@@ -1,33 +1,115 @@
-from typing import Union
+import random
 
 from backoff import expo, on_exception
 from configs import loguru_config, settings_config
 from loguru import logger
-from pydantic import ValidationError
+from pydantic import BaseModel, ValidationError
 from schemas import FullPersonData, GenreData, MovieData
 
 logger.add(**loguru_config)
 
+MOVIE_ROLES = ('director', 'actor', 'writer')
+
+INDEX_MODELS = {
+    'movies': MovieData,
+    'genres': GenreData,
+    'persons': FullPersonData,
+}
+
 
 class DataTransformer:
-    """A class to validate and transform postgres data with pydantic model."""
+    """
+    A class to transform postgres data into ready-to-index documents.
+
+    Documents are built as plain dicts. Depending on `TRANSFORM_VALIDATION` they are all
+    validated with the pydantic models (`strict`), only a random share of
+    `VALIDATION_SAMPLE_RATE` of them is validated (`sampled`), or validation is skipped (`off`).
+    """
 
+    def __init__(
+        self,
+        validation: str = settings_config.TRANSFORM_VALIDATION,
+        sample_rate: float = settings_config.VALIDATION_SAMPLE_RATE,
+    ):
+        self.validation = validation
+        self.sample_rate = sample_rate
+
+    @staticmethod
     def get_persons_by_role(
-        self, persons: list[dict], roles: list[str]
+        persons: list[dict], roles: tuple[str, ...] = MOVIE_ROLES
     ) -> dict[str, tuple[list[dict], list[str]]]:
-        persons_data_by_role = {}
-        for role in roles:
-            persons_with_role = [
-                {'id': person.get('id'), 'full_name': person.get('full_name')}
-                for person in persons
-                if person.get('role') == role
-            ]
-            names_of_persons_with_role = [
-                person.get('full_name') for person in persons_with_role
-            ]
-            persons_data_by_role[role] = (persons_with_role, names_of_persons_with_role)
+        """
+        Partitions the persons of a movie by their role in a single pass.
+        """
+
+        persons_data_by_role = {role: ([], []) for role in roles}
+        for person in persons:
+            persons_with_role = persons_data_by_role.get(person['role'])
+            if persons_with_role is None:
+                continue
+            full_name = person['full_name']
+            persons_with_role[0].append({'id': person['id'], 'full_name': full_name})
+            persons_with_role[1].append(full_name)
         return persons_data_by_role
 
+    @staticmethod
+    def make_genre(genre: dict) -> dict:
+        return {
+            'id': genre['id'],
+            'name': genre['name'],
+            'description': genre.get('description'),
+        }
+
+    def make_movie(self, movie: dict) -> dict:
+        persons = self.get_persons_by_role(movie['all_persons'])
+        directors, directors_names = persons['director']
+        actors, actors_names = persons['actor']
+        writers, writers_names = persons['writer']
+        genres = [self.make_genre(genre) for genre in movie['all_genres']]
+        return {
+            'id': movie['id'],
+            'imdb_rating': movie.get('rating'),
+            'type': movie['type'],
+            'creation_date': movie.get('creation_date'),
+            'genres': genres,
+            'title': movie['title'],
+            'file_path': movie.get('file_path'),
+            'description': movie.get('description'),
+            'directors_names': directors_names,
+            'actors_names': actors_names,
+            'writers_names': writers_names,
+            'genre_ids': [genre['id'] for genre in genres],
+            'director_ids': [person['id'] for person in directors],
+            'actor_ids': [person['id'] for person in actors],
+            'writer_ids': [person['id'] for person in writers],
+            'directors': directors,
+            'actors': actors,
+            'writers': writers,
+        }
+
+    @staticmethod
+    def make_person(person: dict) -> dict:
+        return {
+            'id': person['id'],
+            'full_name': person['full_name'],
+            'roles': [role for role in person['roles'] if role],
+            'movies_ids': [movie['id'] for movie in person['all_movies']],
+        }
+
+    def validate(self, documents: list[dict], model: type[BaseModel]) -> list[dict]:
+        """
+        Validates the documents with the pydantic model according to the validation mode.
+        In strict mode the validated documents replace the original ones.
+        """
+
+        if self.validation == 'strict':
+            return [model.parse_obj(document).dict() for document in documents]
+        if self.validation == 'sampled':
+            for document in documents:
+                if random.random() < self.sample_rate:
+                    model.parse_obj(document)
+        return documents
+
     @on_exception(
         expo, ValidationError, max_tries=settings_config.MAX_TRIES, logger=logger
     )
@@ -35,56 +117,11 @@ class DataTransformer:
         self,
         movies_data: list[dict],
         index_name: str,
-    ) -> list[Union[MovieData, GenreData, FullPersonData]]:
-        es_data = []
+    ) -> list[dict]:
         if index_name == 'movies':
-            for movie in movies_data:
-                persons = self.get_persons_by_role(
-                    persons=movie.get('all_persons'),
-                    roles=['director', 'actor', 'writer'],
-                )
-                genres = [
-                    GenreData(
-                        id=genre.get('id'),
-                        name=genre.get('name'),
-                        description=genre.get('description'),
-                    )
-                    for genre in movie.get('all_genres')
-                ]
-                movie_data = MovieData(
-                    id=movie.get('id'),
-                    imdb_rating=movie.get('rating'),
-                    type=movie.get('type'),
-                    creation_date=movie.get("creation_date"),
-                    genres=genres,
-                    title=movie.get('title'),
-                    file_path=movie.get("file_path"),
-                    description=movie.get('description'),
-                    directors_names=persons.get('director')[1],
-                    actors_names=persons.get('actor')[1],
-                    writers_names=persons.get('writer')[1],
-                    directors=persons.get('director')[0],
-                    actors=persons.get('actor')[0],
-                    writers=persons.get('writer')[0],
-                )
-                es_data.append(movie_data)
-            return es_data
+            es_data = [self.make_movie(movie) for movie in movies_data]
         elif index_name == 'genres':
-            for genre in movies_data:
-                genre_data = GenreData(
-                    id=genre.get('id'),
-                    name=genre.get('name'),
-                    description=genre.get('description'),
-                )
-                es_data.append(genre_data)
-            return es_data
+            es_data = [self.make_genre(genre) for genre in movies_data]
         else:
-            for person in movies_data:
-                person_data = FullPersonData(
-                    id=person.get('id'),
-                    full_name=person.get('full_name'),
-                    roles=person.get('roles'),
-                    movies_ids=[movie.get('id') for movie in person.get('all_movies')],
-                )
-                es_data.append(person_data)
-            return es_data
+            es_data = [self.make_person(person) for person in movies_data]
+        return self.validate(es_data, INDEX_MODELS[index_name])
@@ -5,7 +5,14 @@ from api.v1.utils import raise_exception_if_not_found, to_response_model
 from core.auth import AuthUser, get_auth_user
 from core.config import Config
 from fastapi import APIRouter, Depends, HTTPException, Query
-from models.schemas import MovieDetail, MovieList, SortField
+from models.schemas import (
+    MovieDetail,
+    MovieList,
+    MovieSearchFilters,
+    MovieShort,
+    MovieType,
+    SortField,
+)
 from services.movies import MovieService, get_service
 
 router = APIRouter(prefix='/movies', tags=['Movies'])
@@ -46,26 +53,62 @@ async def get_movies_list(
 @router.get(
     path='/search',
     name='Search Movies',
-    description='Search for movies by title and paginate the results',
+    description='Search for movies by title, description and people with optional filtering by genre, '
+    'IMDb rating, type and year, and paginate the results',
     response_model=list[MovieList],
     response_model_exclude_unset=True,
 )
 async def get_movies_by_search(
     query: str,
+    genre_id: UUID = None,
+    rating_from: float = Query(default=None, ge=0, le=10),
+    rating_to: float = Query(default=None, ge=0, le=10),
+    type: MovieType = None,
+    year_from: int = Query(default=None, ge=0),
+    year_to: int = Query(default=None, ge=0),
     page_number: int = Query(default=0, ge=0),
     page_size: int = Query(default=Config.PROJECT_GLOBAL_PAGE_SIZE, gt=0),
     movie_service: MovieService = Depends(get_service),
 ) -> list[MovieList]:
     """
-    Search for movies by title and paginate the results.
+    Search for movies by title, description and people with optional filtering by genre, IMDb rating, type
+    and year, and paginate the results.
     """
+    filters = MovieSearchFilters(
+        genre_id=genre_id,
+        rating_from=rating_from,
+        rating_to=rating_to,
+        type=type,
+        year_from=year_from,
+        year_to=year_to,
+    )
     movies_list = await movie_service.get_movies_by_search(
-        query, page_number, page_size
+        query, filters, page_number, page_size
     )
     raise_exception_if_not_found(movies_list, 'No movies found')
     return to_response_model(movies_list, MovieList)
 
 
+@router.get(
+    path='/suggest',
+    name='Suggest Movies',
+    description='Get movies whose title starts with the typed prefix, for search-as-you-type',
+    response_model=list[MovieShort],
+    response_model_exclude_unset=True,
+)
+async def get_movies_suggestions(
+    query: str = Query(min_length=1),
+    size: int = Query(default=Config.PROJECT_SUGGEST_SIZE, gt=0, le=50),
+    movie_service: MovieService = Depends(get_service),
+) -> list[MovieShort]:
+    """
+    Get movies whose title starts with the typed prefix, for search-as-you-type.
+    """
+    movies_list = await movie_service.get_movies_suggestions(query, size)
+    raise_exception_if_not_found(movies_list, 'No movies found')
+    return to_response_model(movies_list, MovieShort)
+
+
 @router.get(
     path='/{movie_id}',
     name='Movie Details',
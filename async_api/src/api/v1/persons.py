@@ -3,7 +3,7 @@ from uuid import UUID
 from api.v1.utils import raise_exception_if_not_found, to_response_model
 from core.config import Config
 from fastapi import APIRouter, Depends, Query
-from models.schemas import PersonDetail
+from models.schemas import MovieList, PersonDetail, PersonShort
 from services.persons import PersonService, get_service
 
 router = APIRouter(prefix='/persons', tags=['Persons'])
@@ -54,6 +54,26 @@ async def get_persons_by_search(
     return to_response_model(persons_list, PersonDetail)
 
 
+@router.get(
+    path='/suggest',
+    name='Suggest Persons',
+    description='Get persons whose name starts with the typed prefix, for search-as-you-type',
+    response_model=list[PersonShort],
+    response_model_exclude_unset=True,
+)
+async def get_persons_suggestions(
+    query: str = Query(min_length=1),
+    size: int = Query(default=Config.PROJECT_SUGGEST_SIZE, gt=0, le=50),
+    person_service: PersonService = Depends(get_service),
+) -> list[PersonShort]:
+    """
+    Get persons whose name starts with the typed prefix, for search-as-you-type.
+    """
+    persons_list = await person_service.get_persons_suggestions(query, size)
+    raise_exception_if_not_found(persons_list, 'No persons found')
+    return to_response_model(persons_list, PersonShort)
+
+
 @router.get(
     path='/{person_id}',
     name='Person Details',
@@ -75,3 +95,26 @@ async def get_person_detail(
         roles=person.roles,
         movies_ids=person.movies_ids,
     )
+
+
+@router.get(
+    path='/{person_id}/films',
+    name='Person Films',
+    description='Get a list of the movies a specific person took part in, with optional pagination',
+    response_model=list[MovieList],
+    response_model_exclude_unset=True,
+)
+async def get_person_films(
+    person_id: UUID,
+    page_number: int = Query(default=0, ge=0),
+    page_size: int = Query(default=Config.PROJECT_GLOBAL_PAGE_SIZE, gt=0),
+    person_service: PersonService = Depends(get_service),
+) -> list[MovieList]:
+    """
+    Get a list of the movies a specific person took part in, with optional pagination.
+    """
+    movies_list = await person_service.get_person_films(
+        person_id, page_number, page_size
+    )
+    raise_exception_if_not_found(movies_list, 'No films found')
+    return to_response_model(movies_list, MovieList)
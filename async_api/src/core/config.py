@@ -43,13 +43,20 @@ class Config(BaseSettings):
     PROJECT_DOCS_URL: str = Field('/api/openapi', env='PROJECT_DOCS_URL')
     PROJECT_OPENAPI_URL: str = Field('/api/openapi.json', env='PROJECT_OPENAPI_URL')
     PROJECT_GLOBAL_PAGE_SIZE: int = Field(20, env='PROJECT_GLOBAL_PAGE_SIZE')
+    PROJECT_SUGGEST_SIZE: int = Field(10, env='PROJECT_SUGGEST_SIZE')
 
     REDIS_HOST: str = Field('127.0.0.1', env='REDIS_HOST')
     REDIS_PORT: int = Field(6379, env='REDIS_PORT')
     REDIS_CACHE_TIMEOUT: int = Field(60 * 10, env='REDIS_CACHE_TIMEOUT')
+    REDIS_SUGGEST_CACHE_TIMEOUT: int = Field(60, env='REDIS_SUGGEST_CACHE_TIMEOUT')
+    # The prefix of the hashes of the films of a person, shared with the ETL invalidating them
+    PERSON_FILMS_CACHE_KEY: str = Field('person_films', env='PERSON_FILMS_CACHE_KEY')
 
     ES_HOST: str = Field('127.0.0.1', env='ES_HOST')
     ES_PORT: int = Field(9200, env='ES_PORT')
+    # Set once the movies index has been rebuilt with the flat id fields, until then the
+    # movies are filtered by their nested genres and persons
+    MOVIES_FLAT_IDS_INDEXED: bool = Field(False, env='MOVIES_FLAT_IDS_INDEXED')
 
     POSTGRES_HOST: str = Field('db', env='POSTGRES_HOST')
     POSTGRES_PORT: int = Field(5432, env='POSTGRES_PORT')
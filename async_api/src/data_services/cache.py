@@ -7,6 +7,15 @@ from aioredis import Redis
 from pydantic import BaseModel, parse_raw_as
 from pydantic.json import pydantic_encoder
 
+# Sets a field of a hash, the expiry is only set when the hash is created, so a hash written
+# to on every request still expires `cache_timeout` seconds after its first page was cached
+PUT_TO_HASH_SCRIPT = """
+redis.call('HSET', KEYS[1], ARGV[1], ARGV[2])
+if redis.call('TTL', KEYS[1]) < 0 then
+    redis.call('EXPIRE', KEYS[1], ARGV[3])
+end
+"""
+
 
 class Cache(ABC):
     @abstractmethod
@@ -27,6 +36,18 @@ class Cache(ABC):
     ) -> None:
         pass
 
+    @abstractmethod
+    async def get_list_from_hash(
+        self, key: str, field: str, model: BaseModel
+    ) -> list[BaseModel] | None:
+        pass
+
+    @abstractmethod
+    async def put_list_to_hash(
+        self, key: str, field: str, data_list: list[BaseModel], cache_timeout: int
+    ) -> None:
+        pass
+
 
 class RedisCache(Cache):
     def __init__(self, redis: Redis):
@@ -54,3 +75,19 @@ class RedisCache(Cache):
     ) -> None:
         list_json = json.dumps(data_list, default=pydantic_encoder)
         await self.redis.set(key=str(key), value=list_json, expire=cache_timeout)
+
+    async def get_list_from_hash(
+        self, key: str, field: str, model: BaseModel
+    ) -> list[BaseModel] | None:
+        data = await self.redis.hget(key, field)
+        if not data:
+            return None
+        return parse_raw_as(list[model], data)
+
+    async def put_list_to_hash(
+        self, key: str, field: str, data_list: list[BaseModel], cache_timeout: int
+    ) -> None:
+        list_json = json.dumps(data_list, default=pydantic_encoder)
+        await self.redis.eval(
+            PUT_TO_HASH_SCRIPT, keys=[key], args=[field, list_json, cache_timeout]
+        )
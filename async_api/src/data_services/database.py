@@ -1,7 +1,8 @@
 from abc import ABC, abstractmethod
 from uuid import UUID
 
-from elasticsearch import AsyncElasticsearch, NotFoundError
+from data_services.query_builder import QueryBuilder
+from elasticsearch import AsyncElasticsearch, NotFoundError, RequestError
 from pydantic import BaseModel
 
 
@@ -24,6 +25,17 @@ class Database(ABC):
     ) -> list[BaseModel]:
         pass
 
+    @abstractmethod
+    async def suggest(
+        self,
+        prefix: str,
+        suggest_field: str,
+        size: int,
+        es_index: str,
+        model: BaseModel,
+    ) -> list[BaseModel]:
+        pass
+
     @abstractmethod
     async def get_list(
         self,
@@ -31,7 +43,7 @@ class Database(ABC):
         page_size: int,
         es_index: str,
         model: BaseModel,
-        query: dict = None,
+        query: QueryBuilder = None,
     ) -> list[BaseModel]:
         pass
 
@@ -59,24 +71,50 @@ class ElasticSearch(Database):
         model: BaseModel,
     ) -> list[BaseModel]:
         body = {"from": page_number * page_size, "size": page_size}
-        query = {
-            "query": {
-                "match": {search_field: {"query": search_string, "fuzziness": "auto"}}
-            }
-        }
-        doc = await self.elastic.search(index=es_index, body=body | query)
+        query = QueryBuilder().match(search_field, search_string)
+        doc = await self.elastic.search(index=es_index, body=body | query.build())
         return [model(**d['_source']) for d in doc['hits']['hits']]
 
+    async def suggest(
+        self,
+        prefix: str,
+        suggest_field: str,
+        size: int,
+        es_index: str,
+        model: BaseModel,
+    ) -> list[BaseModel]:
+        body = {
+            "size": 0,
+            "_source": list(model.__fields__),
+            "suggest": {
+                "suggestion": {
+                    "prefix": prefix,
+                    "completion": {
+                        "field": suggest_field,
+                        "size": size,
+                        "skip_duplicates": True,
+                    },
+                }
+            },
+        }
+        try:
+            doc = await self.elastic.search(index=es_index, body=body)
+        except RequestError:
+            # The index lacks the completion subfield until the ETL has updated its mapping
+            return []
+        options = doc['suggest']['suggestion'][0]['options']
+        return [model(**option['_source']) for option in options]
+
     async def get_list(
         self,
         page_number: int,
         page_size: int,
         es_index: str,
         model: BaseModel,
-        query: dict = None,
+        query: QueryBuilder = None,
     ) -> list[BaseModel]:
-        body = {"from": page_number * page_size, "size": page_size}
-        if query:
-            body = body | query
-        docs = await self.elastic.search(index=es_index, body=body)
+        query = query or QueryBuilder()
+        body = {"from": page_number * page_size, "size": page_size} | query.build()
+        params = {"request_cache": True} if query.request_cache else {}
+        docs = await self.elastic.search(index=es_index, body=body, **params)
         return [model(**d['_source']) for d in docs['hits']['hits']]
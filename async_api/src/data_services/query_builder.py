@@ -0,0 +1,116 @@
+from typing import Any, Optional
+
+
+class QueryBuilder:
+    """
+    The QueryBuilder class assembles Elasticsearch search bodies. Scoring clauses go to the `must` part of a
+    bool query, structural filters go to its `filter` part, where they don't affect scoring and are cached by
+    Elasticsearch. Total hits are not tracked, since the API doesn't return them.
+    """
+
+    def __init__(self):
+        self.must: list[dict] = []
+        self.filter: list[dict] = []
+        self.sort_clause: Optional[dict] = None
+        self.request_cache = False
+
+    def match(self, field: str, value: str, fuzziness: str = 'auto') -> 'QueryBuilder':
+        self.must.append({"match": {field: {"query": value, "fuzziness": fuzziness}}})
+        return self
+
+    def multi_match(
+        self, value: str, fields: list[str], fuzziness: str = 'auto'
+    ) -> 'QueryBuilder':
+        self.must.append(
+            {"multi_match": {"query": value, "fields": fields, "fuzziness": fuzziness}}
+        )
+        return self
+
+    def term(self, field: str, value: Any) -> 'QueryBuilder':
+        self.filter.append({"term": {field: str(value)}})
+        return self
+
+    def terms(self, field: str, values: list[Any]) -> 'QueryBuilder':
+        self.filter.append({"terms": {field: [str(value) for value in values]}})
+        return self
+
+    def any_terms(self, fields: list[str], values: list[Any]) -> 'QueryBuilder':
+        """
+        Filter the documents having any of the values in any of the fields.
+        """
+        values = [str(value) for value in values]
+        self.filter.append(
+            {
+                "bool": {
+                    "should": [{"terms": {field: values}} for field in fields],
+                    "minimum_should_match": 1,
+                }
+            }
+        )
+        return self
+
+    def nested_term(self, path: str, field: str, value: Any) -> 'QueryBuilder':
+        self.filter.append(
+            {"nested": {"path": path, "query": {"term": {field: str(value)}}}}
+        )
+        return self
+
+    def any_nested_terms(
+        self, paths: list[str], field: str, values: list[Any]
+    ) -> 'QueryBuilder':
+        """
+        Filter the documents having any of the values in the field of any of the nested objects.
+        """
+        values = [str(value) for value in values]
+        self.filter.append(
+            {
+                "bool": {
+                    "should": [
+                        {
+                            "nested": {
+                                "path": path,
+                                "query": {"terms": {f'{path}.{field}': values}},
+                            }
+                        }
+                        for path in paths
+                    ],
+                    "minimum_should_match": 1,
+                }
+            }
+        )
+        return self
+
+    def range(self, field: str, gte: Any = None, lte: Any = None) -> 'QueryBuilder':
+        bounds = {
+            name: value
+            for name, value in (("gte", gte), ("lte", lte))
+            if value is not None
+        }
+        if bounds:
+            self.filter.append({"range": {field: bounds}})
+        return self
+
+    def sort(self, field: str, order: str) -> 'QueryBuilder':
+        self.sort_clause = {field: order}
+        return self
+
+    def cached(self) -> 'QueryBuilder':
+        """
+        Let the shard request cache serve the query. Only use it for hot pages that don't depend
+        on user input.
+        """
+        self.request_cache = True
+        return self
+
+    def build(self) -> dict:
+        body = {"track_total_hits": False}
+        if self.must or self.filter:
+            bool_query = {}
+            if self.must:
+                bool_query["must"] = self.must
+            if self.filter:
+                bool_query["filter"] = self.filter
+            body["query"] = {"bool": bool_query}
+        if self.sort_clause:
+            body["sort"] = self.sort_clause
+        return body
@@ -15,6 +15,22 @@ class SortField(str, Enum):
     imdb_rating_desc = '-imdb_rating'
 
 
+class MovieType(str, Enum):
+    movie = 'movie'
+    tv_show = 'tv_show'
+
+
+class MovieSearchFilters(BaseModel):
+    """A Pydantic model that represents the filters of a movies search."""
+
+    genre_id: Optional[UUID] = None
+    rating_from: Optional[float] = None
+    rating_to: Optional[float] = None
+    type: Optional[MovieType] = None
+    year_from: Optional[int] = None
+    year_to: Optional[int] = None
+
+
 class FastJSONMixin(BaseModel):
     """
     A Pydantic `BaseModel` subclass with UUID field and `orjson` serialization/deserialization
@@ -81,6 +97,16 @@ class MovieList(FastJSONMixin):
     )
 
 
+class MovieShort(FastJSONMixin):
+    """A Pydantic model that represents a movie suggestion."""
+
+    title: str = Field(
+        title='Movie title',
+        max_length=255,
+        example='Star Wars: Episode IV - A New Hope',
+    )
+
+
 class GenreDetail(FastJSONMixin):
     """A Pydantic model that represents a movie genre."""
 
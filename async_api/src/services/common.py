@@ -4,9 +4,18 @@ from uuid import UUID
 from core.config import Config
 from data_services.cache import Cache
 from data_services.database import Database
-from models.schemas import MovieList
+from data_services.query_builder import QueryBuilder
+from models.schemas import MovieList, MovieSearchFilters
 from pydantic import BaseModel
 
+# The nested objects the flat id fields of a movie are derived from
+NESTED_ID_PATHS = {
+    'genre_ids': 'genres',
+    'director_ids': 'directors',
+    'actor_ids': 'actors',
+    'writer_ids': 'writers',
+}
+
 
 class MovieCommonService:
     """
@@ -58,6 +67,130 @@ class MovieCommonService:
             )
         return data
 
+    async def get_suggestions(
+        self,
+        prefix: str,
+        suggest_field: str,
+        size: int,
+        es_index: str,
+        cache_timeout: int,
+        model: BaseModel,
+    ) -> list[BaseModel]:
+        """
+        Retrieve a list of completion suggestions for a prefix from the database and cache.
+        """
+        prefix = prefix.strip().lower()
+        key = f'{es_index}:suggest:{prefix}:{size}'
+        data = await self.cache.get_list(key=key, model=model)
+        if not data:
+            data = await self.database.suggest(
+                prefix, suggest_field, size, es_index, model
+            )
+            await self.cache.put_list(
+                key=key, data_list=data, cache_timeout=cache_timeout
+            )
+        return data
+
+    async def get_by_multi_match_search(
+        self,
+        search_string: str,
+        search_fields: list[str],
+        filters: MovieSearchFilters,
+        page_number: int,
+        page_size: int,
+        es_index: str,
+        cache_timeout: int,
+        model: BaseModel,
+    ) -> list[BaseModel]:
+        """
+        Retrieve a list of movies by a search across several boosted fields, narrowed down by filters,
+        from the database and cache. The filters run in filter context, so they don't affect scoring
+        and are cached by Elasticsearch.
+        """
+        query = self._filter_movies(
+            QueryBuilder().multi_match(search_string, search_fields), filters
+        )
+        filters_key = filters.json(exclude_none=True)
+        key = (
+            f'{es_index}:{search_string}:multi_match:'
+            f'{filters_key}:{page_number}:{page_size}'
+        )
+        data_list = await self.cache.get_list(key=key, model=model)
+        if not data_list:
+            data_list = await self.database.get_list(
+                page_number, page_size, es_index, model, query
+            )
+            await self.cache.put_list(
+                key=key, data_list=data_list, cache_timeout=cache_timeout
+            )
+        return data_list
+
+    @staticmethod
+    def _filter_movies(
+        query: QueryBuilder, filters: MovieSearchFilters
+    ) -> QueryBuilder:
+        """
+        Add the filter clauses of a movies query.
+        """
+        if filters.genre_id:
+            MovieCommonService._filter_genre(query, filters.genre_id)
+        if filters.type:
+            query.term('type', filters.type.value)
+        query.range('imdb_rating', gte=filters.rating_from, lte=filters.rating_to)
+        date_from = date_to = None
+        if filters.year_from is not None:
+            date_from = f'{filters.year_from:04d}-01-01'
+        if filters.year_to is not None:
+            date_to = f'{filters.year_to:04d}-12-31'
+        query.range('creation_date', gte=date_from, lte=date_to)
+        return query
+
+    @staticmethod
+    def _filter_genre(query: QueryBuilder, genre_id: UUID) -> QueryBuilder:
+        """
+        Add the genre filter clause, by the nested genres until the flat ids are indexed.
+        """
+        if Config.MOVIES_FLAT_IDS_INDEXED:
+            return query.terms('genre_ids', [genre_id])
+        return query.nested_term('genres', 'genres.id', genre_id)
+
+    async def get_list_by_person(
+        self,
+        person_id: UUID,
+        person_fields: list[str],
+        page_number: int,
+        page_size: int,
+        es_index: str,
+        cache_timeout: int,
+        model: BaseModel,
+    ) -> list[BaseModel]:
+        """
+        Retrieve a list of the movies of a person with a single query from the database and cache. The pages
+        of a person are kept in one Redis hash, so the ETL can invalidate them at once.
+        """
+        key = f'{Config.PERSON_FILMS_CACHE_KEY}:{person_id}'
+        field = f'{page_number}:{page_size}'
+        data_list = await self.cache.get_list_from_hash(
+            key=key, field=field, model=model
+        )
+        if not data_list:
+            query = QueryBuilder().sort('imdb_rating', 'desc')
+            if Config.MOVIES_FLAT_IDS_INDEXED:
+                query.any_terms(person_fields, [person_id])
+            else:
+                query.any_nested_terms(
+                    [NESTED_ID_PATHS[field] for field in person_fields],
+                    'id',
+                    [person_id],
+                )
+            data_list = await self.database.get_list(
+                page_number, page_size, es_index, model, query
+            )
+            await self.cache.put_list_to_hash(
+                key=key, field=field, data_list=data_list, cache_timeout=cache_timeout
+            )
+        return data_list
+
     async def get_list(
         self,
         page_number: int,
@@ -73,7 +206,7 @@ class MovieCommonService:
         data_list = await self.cache.get_list(key=key, model=model)
         if not data_list:
             data_list = await self.database.get_list(
-                page_number, page_size, es_index, model
+                page_number, page_size, es_index, model, QueryBuilder().cached()
             )
             await self.cache.put_list(
                 key=key, data_list=data_list, cache_timeout=cache_timeout
@@ -92,16 +225,12 @@ class MovieCommonService:
         model: BaseModel,
     ) -> list[BaseModel]:
         """
-        Retrieve a list of movies sorted by a specific field from the database and cache.
+        Retrieve a list of movies sorted by a specific field from the database and cache. The genre is
+        filtered in filter context and the shard request cache is used, since these pages are hot.
         """
-        query = {"sort": {sort_field: sort_type}}
+        query = QueryBuilder().sort(sort_field, sort_type).cached()
         if genre_id:
-            query["query"] = {
-                "nested": {
-                    "path": "genres",
-                    "query": {"bool": {"must": [{"match": {"genres.id": genre_id}}]}},
-                }
-            }
+            self._filter_genre(query, genre_id)
         key = (
             f'{es_index}:{sort_field}:{sort_type}:{genre_id}:{page_number}:{page_size}'
         )
@@ -10,10 +10,18 @@ from db.elastic import es_manager
 from db.redis import redis_manager
 from elasticsearch import AsyncElasticsearch
 from fastapi import Depends
-from models.schemas import MovieDetail
+from models.schemas import MovieDetail, MovieSearchFilters, MovieShort
 from pydantic import BaseModel
 from services.common import MovieCommonService
 
+MOVIES_SEARCH_FIELDS = [
+    'title^5',
+    'directors_names^2',
+    'actors_names^2',
+    'writers_names^1.5',
+    'description',
+]
+
 
 class MovieService(MovieCommonService):
     """
@@ -39,14 +47,20 @@ class MovieService(MovieCommonService):
         )
 
     async def get_movies_by_search(
-        self, search_string: str, page_number: int, page_size: int
+        self,
+        search_string: str,
+        filters: MovieSearchFilters,
+        page_number: int,
+        page_size: int,
     ) -> list[BaseModel]:
         """
-        Retrieve a list of movies by search from the database and cache.
+        Retrieve a list of movies by search across titles, descriptions and people from the database
+        and cache.
         """
-        return await self.get_by_search(
+        return await self.get_by_multi_match_search(
             search_string=search_string,
-            search_field='title',
+            search_fields=MOVIES_SEARCH_FIELDS,
+            filters=filters,
             page_number=page_number,
             page_size=page_size,
             es_index=self.es_index,
@@ -54,6 +68,19 @@ class MovieService(MovieCommonService):
             cache_timeout=Config.REDIS_CACHE_TIMEOUT,
         )
 
+    async def get_movies_suggestions(self, prefix: str, size: int) -> list[MovieShort]:
+        """
+        Retrieve a list of movies whose title starts with the prefix from the database and cache.
+        """
+        return await self.get_suggestions(
+            prefix=prefix,
+            suggest_field='title.suggest',
+            size=size,
+            es_index=self.es_index,
+            model=MovieShort,
+            cache_timeout=Config.REDIS_SUGGEST_CACHE_TIMEOUT,
+        )
+
     async def get_sorted_movies(
         self,
         page_number: int,
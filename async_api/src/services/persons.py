@@ -10,7 +10,7 @@ from db.elastic import es_manager
 from db.redis import redis_manager
 from elasticsearch import AsyncElasticsearch
 from fastapi import Depends
-from models.schemas import PersonDetail
+from models.schemas import MovieList, PersonDetail, PersonShort
 from pydantic import BaseModel
 from services.common import MovieCommonService
 
@@ -54,6 +54,37 @@ class PersonService(MovieCommonService):
             cache_timeout=Config.REDIS_CACHE_TIMEOUT,
         )
 
+    async def get_persons_suggestions(
+        self, prefix: str, size: int
+    ) -> list[PersonShort]:
+        """
+        Retrieve a list of persons whose name starts with the prefix from the database and cache.
+        """
+        return await self.get_suggestions(
+            prefix=prefix,
+            suggest_field='full_name.suggest',
+            size=size,
+            es_index=self.es_index,
+            model=PersonShort,
+            cache_timeout=Config.REDIS_SUGGEST_CACHE_TIMEOUT,
+        )
+
+    async def get_person_films(
+        self, person_id: UUID, page_number: int, page_size: int
+    ) -> list[MovieList]:
+        """
+        Retrieve a list of the movies a person took part in from the database and cache.
+        """
+        return await self.get_list_by_person(
+            person_id=person_id,
+            person_fields=['director_ids', 'actor_ids', 'writer_ids'],
+            page_number=page_number,
+            page_size=page_size,
+            es_index='movies',
+            model=MovieList,
+            cache_timeout=Config.REDIS_CACHE_TIMEOUT,
+        )
+
     async def get_persons_list(
         self, page_number: int, page_size: int
     ) -> Optional[list[PersonDetail]]:
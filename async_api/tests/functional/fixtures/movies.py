@@ -1,13 +1,32 @@
 import pytest
 
 from tests.functional.utils.helpers import extract_payload
-from tests.functional.utils.schemas import MovieDetail
+from tests.functional.utils.schemas import GenreDetail, MovieDetail, MovieDocument
+
+NOT_REINDEXED_GENRE_ID = '5f7c1c2e-6a1d-4d0b-9d55-2e0f3a8b9c41'
 
 
 @pytest.fixture(scope='session')
 async def load_testing_movies_data(es_client):
     index = 'movies'
-    payload = await extract_payload(f'{index}.json', MovieDetail, index)
+    payload = await extract_payload(f'{index}.json', MovieDocument, index)
     await es_client.bulk(body=payload[0], index=index, refresh=True)
     yield
     await es_client.bulk(body=payload[1], index=index, refresh=True)
+
+
+@pytest.fixture(scope='session')
+async def load_not_reindexed_movie(es_client):
+    """A movie indexed before the flat ids were added, it has only the nested genres"""
+    index = 'movies'
+    movie = MovieDetail(
+        id='9b1e3f0a-7c2d-4e5f-8a6b-1c2d3e4f5a6b',
+        title='Unreindexed',
+        imdb_rating=5.5,
+        genres=[GenreDetail(id=NOT_REINDEXED_GENRE_ID, name='Noir')],
+    )
+    await es_client.index(
+        index=index, id=str(movie.id), body=movie.json(), refresh=True
+    )
+    yield movie
+    await es_client.delete(index=index, id=str(movie.id), refresh=True)
@@ -1,5 +1,6 @@
 from http import HTTPStatus
 
+from tests.functional.fixtures.movies import NOT_REINDEXED_GENRE_ID
 from tests.functional.utils.helpers import extract_movie, extract_movies
 
 pytest_plugins = "tests.functional.fixtures.movies"
@@ -121,7 +122,7 @@ async def test_movies_search(make_get_request, redis_client):
 
     response = await make_get_request(f'movies/search?query={movie_title}')
     search_movies = await extract_movies(response)
-    cache = await redis_client.get(f'movies:{movie_title}:title:0:20')
+    cache = await redis_client.get(f'movies:{movie_title}:multi_match:{{}}:0:20')
 
     assert response.status == HTTPStatus.OK
     assert len(search_movies) > 0
@@ -137,7 +138,7 @@ async def test_movies_search_with_pagination(make_get_request, redis_client):
         f'movies/search?query={movie_title}&page_number=0&page_size=10'
     )
     search_movies = await extract_movies(response)
-    cache = await redis_client.get(f'movies:{movie_title}:title:0:10')
+    cache = await redis_client.get(f'movies:{movie_title}:multi_match:{{}}:0:10')
 
     assert response.status == HTTPStatus.OK
     assert len(search_movies) > 0
@@ -169,7 +170,9 @@ async def test_movies_search_no_results(make_get_request, redis_client):
     response = await make_get_request(f'movies/search?query={non_existent_movie_title}')
 
     response_body = response.body
-    cache = await redis_client.get(f'movies:{non_existent_movie_title}:title:0:20')
+    cache = await redis_client.get(
+        f'movies:{non_existent_movie_title}:multi_match:{{}}:0:20'
+    )
     decoded_cache = cache.decode('UTF-8').lower()
 
     assert response.status == HTTPStatus.NOT_FOUND
@@ -178,6 +181,81 @@ async def test_movies_search_no_results(make_get_request, redis_client):
     assert non_existent_movie_title.lower() not in decoded_cache
 
 
+async def test_movies_search_by_person_name(make_get_request, redis_client):
+    response = await make_get_request('movies/search?query=Jennifer Hale')
+    search_movies = await extract_movies(response)
+    cache = await redis_client.get('movies:Jennifer Hale:multi_match:{}:0:20')
+
+    assert response.status == HTTPStatus.OK
+    assert 'Blindeer' in [movie.title for movie in search_movies]
+    assert cache
+
+
+async def test_movies_search_with_filters(make_get_request, redis_client):
+    response = await make_get_request(
+        'movies/search?query=Blindeer&genre_id=120a21cf-9097-479e-904a-13dd7198c1dd'
+        '&rating_from=6&rating_to=7'
+    )
+    search_movies = await extract_movies(response)
+    cache = await redis_client.get(
+        'movies:Blindeer:multi_match:'
+        '{"genre_id": "120a21cf-9097-479e-904a-13dd7198c1dd", "rating_from": 6.0, "rating_to": 7.0}'
+        ':0:20'
+    )
+
+    assert response.status == HTTPStatus.OK
+    assert search_movies[0].title == 'Blindeer'
+    assert cache
+
+
+async def test_movies_search_filtered_out(make_get_request):
+    response = await make_get_request('movies/search?query=Blindeer&rating_from=9')
+
+    assert response.status == HTTPStatus.NOT_FOUND
+    assert response.body == {'detail': 'No movies found'}
+
+
+async def test_movies_search_invalid_rating(make_get_request):
+    response = await make_get_request('movies/search?query=Blindeer&rating_to=11')
+
+    assert response.status == HTTPStatus.UNPROCESSABLE_ENTITY
+
+
+async def test_movies_suggest(make_get_request, redis_client):
+    response = await make_get_request('movies/suggest?query=Blin')
+    suggestions = response.body
+    cache = await redis_client.get('movies:suggest:blin:10')
+
+    assert response.status == HTTPStatus.OK
+    assert suggestions[0] == {
+        'id': '2a090dde-f688-46fe-a9f4-b781a9852756',
+        'title': 'Blindeer',
+    }
+    assert cache
+
+
+async def test_movies_suggest_size(make_get_request, redis_client):
+    response = await make_get_request('movies/suggest?query=b&size=1')
+    cache = await redis_client.get('movies:suggest:b:1')
+
+    assert response.status == HTTPStatus.OK
+    assert len(response.body) == 1
+    assert cache
+
+
+async def test_movies_suggest_no_results(make_get_request):
+    response = await make_get_request('movies/suggest?query=NonExistentMovieTitle1234')
+
+    assert response.status == HTTPStatus.NOT_FOUND
+    assert response.body == {'detail': 'No movies found'}
+
+
+async def test_movies_suggest_empty_query(make_get_request):
+    response = await make_get_request('movies/suggest?query=')
+
+    assert response.status == HTTPStatus.UNPROCESSABLE_ENTITY
+
+
 async def test_movies_popular_in_genre(make_get_request, redis_client):
     response = await make_get_request(
         'movies/genres/120a21cf-9097-479e-904a-13dd7198c1dd'
@@ -192,6 +270,23 @@ async def test_movies_popular_in_genre(make_get_request, redis_client):
     assert cache
 
 
+async def test_movies_genre_filter_not_reindexed(
+    make_get_request, load_not_reindexed_movie
+):
+    # The API runs with MOVIES_FLAT_IDS_INDEXED off, so it filters by the nested genres
+    response = await make_get_request(
+        f'movies?sort=-imdb_rating&genre_id={NOT_REINDEXED_GENRE_ID}'
+    )
+    movies = await extract_movies(response)
+    response_popular = await make_get_request(f'movies/genres/{NOT_REINDEXED_GENRE_ID}')
+    popular_movies = await extract_movies(response_popular)
+
+    assert response.status == HTTPStatus.OK
+    assert [movie.id for movie in movies] == [load_not_reindexed_movie.id]
+    assert response_popular.status == HTTPStatus.OK
+    assert [movie.id for movie in popular_movies] == [load_not_reindexed_movie.id]
+
+
 async def test_similar_movies(make_get_request, redis_client):
     response_movies = await make_get_request('movies?sort=-imdb_rating')
     movies_list = await extract_movies(response_movies)
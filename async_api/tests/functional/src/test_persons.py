@@ -2,7 +2,10 @@ from http import HTTPStatus
 
 from tests.functional.utils.helpers import extract_person, extract_persons
 
-pytest_plugins = "tests.functional.fixtures.persons"
+pytest_plugins = (
+    "tests.functional.fixtures.persons",
+    "tests.functional.fixtures.movies",
+)
 
 
 async def test_general_persons_list(
@@ -124,6 +127,26 @@ async def test_persons_search_no_results(make_get_request, redis_client):
     assert non_existent_person_name.lower() not in decoded_cache
 
 
+async def test_persons_suggest(make_get_request, redis_client):
+    response = await make_get_request('persons/suggest?query=Lars')
+    suggestions = response.body
+    cache = await redis_client.get('persons:suggest:lars:10')
+
+    assert response.status == HTTPStatus.OK
+    assert suggestions[0] == {
+        'id': '00e1b6fd-cc86-4841-a983-5a3d34e4da98',
+        'full_name': 'Lars Alexanderson',
+    }
+    assert cache
+
+
+async def test_persons_suggest_no_results(make_get_request):
+    response = await make_get_request('persons/suggest?query=NonExistentPersonName1234')
+
+    assert response.status == HTTPStatus.NOT_FOUND
+    assert response.body == {'detail': 'No persons found'}
+
+
 async def test_es_person_uploading(make_get_request, redis_client):
     response = await make_get_request('persons/00e1b6fd-cc86-4841-a983-5a3d34e4da98')
     person = await extract_person(response)
@@ -132,3 +155,42 @@ async def test_es_person_uploading(make_get_request, redis_client):
     assert str(person.id) == "00e1b6fd-cc86-4841-a983-5a3d34e4da98"
     assert person.full_name == "Lars Alexanderson"
     assert cache
+
+
+async def test_person_films(make_get_request, load_testing_movies_data, redis_client):
+    person_id = '00395304-dd52-4c7b-be0d-c2cd7a495684'
+
+    response = await make_get_request(f'persons/{person_id}/films')
+    cache = await redis_client.hget(f'person_films:{person_id}', '0:20')
+
+    assert response.status == HTTPStatus.OK
+    assert len(response.body) == 2
+    assert all('title' in movie for movie in response.body)
+    assert cache
+
+
+async def test_person_films_pagination(
+    make_get_request, load_testing_movies_data, redis_client
+):
+    person_id = '00395304-dd52-4c7b-be0d-c2cd7a495684'
+
+    first_page = await make_get_request(f'persons/{person_id}/films?page_size=1')
+    second_page = await make_get_request(
+        f'persons/{person_id}/films?page_number=1&page_size=1'
+    )
+    cache = await redis_client.hgetall(f'person_films:{person_id}')
+
+    assert first_page.status == HTTPStatus.OK
+    assert second_page.status == HTTPStatus.OK
+    assert len(first_page.body) == len(second_page.body) == 1
+    assert first_page.body[0]['id'] != second_page.body[0]['id']
+    assert {b'0:1', b'1:1'} <= set(cache)
+
+
+async def test_person_films_no_results(make_get_request):
+    response = await make_get_request(
+        'persons/00e1b6fd-cc86-4841-a983-5a3d34e4da98/films'
+    )
+
+    assert response.status == HTTPStatus.NOT_FOUND
+    assert response.body == {'detail': 'No films found'}
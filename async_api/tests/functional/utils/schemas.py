@@ -3,7 +3,7 @@ from typing import Optional
 from uuid import UUID
 
 from multidict import CIMultiDictProxy
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, root_validator
 
 
 class IdMixin(BaseModel):
@@ -149,6 +149,29 @@ class MovieDetail(MovieList):
     )
 
 
+class MovieDocument(MovieDetail):
+    """
+    A Pydantic model that represents a movie document as the ETL indexes it, with the flat ids of its genres
+    and persons derived from the nested lists.
+    """
+
+    genre_ids: list[UUID] = []
+    director_ids: list[UUID] = []
+    actor_ids: list[UUID] = []
+    writer_ids: list[UUID] = []
+
+    @root_validator
+    def derive_flat_ids(cls, values: dict) -> dict:
+        for ids_field, nested_field in (
+            ('genre_ids', 'genres'),
+            ('director_ids', 'directors'),
+            ('actor_ids', 'actors'),
+            ('writer_ids', 'writers'),
+        ):
+            values[ids_field] = [item.id for item in values.get(nested_field) or []]
+        return values
+
+
 @dataclass
 class HTTPResponse:
     body: dict
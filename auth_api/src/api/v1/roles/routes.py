@@ -6,6 +6,7 @@ from core.utils import jwt_roles_required, rate_limit
 from db.sql import db_manager
 from flask import Blueprint, jsonify, make_response, request
 from models.models import Role, User, UserRole
+from services.user import get_role_user_ids, invalidate_user_roles
 
 role = Blueprint('role', __name__, url_prefix='/role')
 
@@ -211,6 +212,7 @@ def update_role(role_id):
         role.description = description
 
     db_manager.db.session.commit()
+    invalidate_user_roles(*get_role_user_ids(role.id))
 
     return jsonify({"message": "Role updated successfully"}), HTTPStatus.OK
 
@@ -264,8 +266,10 @@ def delete_role(role_id):
     if role is None:
         return jsonify({"error": "Role not found"}), HTTPStatus.NOT_FOUND
 
+    user_ids = get_role_user_ids(role.id)
     db_manager.db.session.delete(role)
     db_manager.db.session.commit()
+    invalidate_user_roles(*user_ids)
 
     return jsonify({"message": "Role deleted successfully"}), HTTPStatus.OK
 
@@ -346,6 +350,7 @@ def assign_role_to_user(user_id):
     user_role = UserRole(user_id=user.id, role_id=role.id)
     db_manager.db.session.add(user_role)
     db_manager.db.session.commit()
+    invalidate_user_roles(user.id)
 
     return jsonify({"message": "Role assigned to user successfully"}), HTTPStatus.OK
 
@@ -435,5 +440,6 @@ def revoke_role_from_user(user_id):
 
     db_manager.db.session.delete(user_role)
     db_manager.db.session.commit()
+    invalidate_user_roles(user.id)
 
     return jsonify({"message": "Role revoked from user successfully"}), HTTPStatus.OK
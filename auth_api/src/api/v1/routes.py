@@ -1,6 +1,8 @@
 from api.v1.roles.routes import role
 from api.v1.social.routes import social
 from api.v1.user.routes import user
+from core.utils import jwt_roles_required
+from db.sql import db_manager
 from flask import Blueprint, jsonify
 
 v1 = Blueprint('v1', __name__, url_prefix='/v1')
@@ -12,3 +14,10 @@ v1.register_blueprint(role)
 @v1.route('/')
 def index():
     return jsonify(result='Hello, World!')
+
+
+@v1.route('/metrics/db_pool')
+@jwt_roles_required()
+def db_pool_metrics():
+    """The connection pool of the worker process serving the request, for the superusers"""
+    return jsonify(db_manager.get_pool_stats())
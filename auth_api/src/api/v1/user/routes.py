@@ -306,7 +306,22 @@ def auth_history(
            name: per_page
            type: int
            example: 3
-           description: events per page
+           description: events per page, at most AUTH_HISTORY_MAX_PER_PAGE
+         - in: query
+           name: mode
+           type: string
+           enum: [page, cursor]
+           example: cursor
+           description: Paginate by page, the default, or by cursor
+         - in: query
+           name: cursor
+           type: string
+           description: The next_cursor of the previous page, implies the cursor mode
+         - in: query
+           name: with_total
+           type: boolean
+           example: false
+           description: Count the events of the history in the cursor mode
        responses:
          '200':
            description: success
@@ -325,6 +340,9 @@ def auth_history(
                          type: integer
                      total:
                          type: integer
+                     next_cursor:
+                         type: string
+                         nullable: true
                      events:
                          type: array
                          items:
@@ -341,9 +359,36 @@ def auth_history(
        tags:
          - authorization
     """
+    # The cursor mode is opt-in, the clients paginating by page keep their response
+    mode = request.args.get('mode', 'cursor' if 'cursor' in request.args else 'page')
+    try:
+        per_page = int(request.args.get('per_page', 3))
+        page = int(request.args.get('page', 1))
+    except ValueError:
+        mode = None
+    if mode not in ('page', 'cursor'):
+        return make_response(
+            jsonify(
+                error_code=user_service.INVALID_PAGINATION.code,
+                message=user_service.INVALID_PAGINATION.message,
+            ),
+            HTTPStatus.BAD_REQUEST,
+        )
+    # The page size is bounded, so every page costs a bounded index scan
+    per_page = min(max(per_page, 1), settings.auth_history_max_per_page)
+
     try:
-        kwargs = {key: int(request.args[key]) for key in request.args}
-        history = user_service.get_auth_history(user_id, **kwargs)
+        if mode == 'cursor':
+            history = user_service.get_auth_history_by_cursor(
+                user_id,
+                cursor=request.args.get('cursor'),
+                per_page=per_page,
+                with_total=request.args.get('with_total', '').lower() in ('1', 'true'),
+            )
+        else:
+            history = user_service.get_auth_history(
+                user_id, page=page, per_page=per_page
+            )
     except ServiceException as err:
         return make_response(jsonify(err), HTTPStatus.BAD_REQUEST)
     return make_response(jsonify(history), HTTPStatus.OK)
@@ -356,8 +401,7 @@ def get_user_roles_list(
     some_user_id: str, user_service: UserService = Provide[Container.user_service]
 ):
     roles_list = user_service.get_user_roles_list(some_user_id)
-    result = [{'role_id': role.id, 'role_name': role.name} for role in roles_list]
-    return jsonify(result)
+    return jsonify(roles_list)
 
 
 @user.route('/roles', methods=['GET'])
@@ -368,5 +412,4 @@ def get_current_user_roles_list(
     user_id: str, user_service: UserService = Provide[Container.user_service]
 ):
     roles_list = user_service.get_user_roles_list(user_id)
-    result = [{'role_id': role.id, 'role_name': role.name} for role in roles_list]
-    return jsonify(result)
+    return jsonify(roles_list)
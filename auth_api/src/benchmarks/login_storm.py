@@ -0,0 +1,124 @@
+"""
+Load test of the latency of the non-login endpoints during a login storm.
+
+A user is signed up, then the roles of the user are requested at a steady rate while the
+login endpoint is flooded by concurrent clients. The latencies of the roles requests are
+reported for a quiet baseline and for the storm, along with the share of the logins rejected
+with 503 when the password hashing pool is saturated. Run from the `src` directory against
+a running server:
+
+    python -m benchmarks.login_storm --url http://localhost:8002 --clients 200 --duration 30
+"""
+from gevent import monkey
+
+monkey.patch_all()
+
+import argparse  # noqa: E402
+import statistics  # noqa: E402
+import time  # noqa: E402
+import uuid  # noqa: E402
+
+from collections import Counter  # noqa: E402
+
+import gevent  # noqa: E402
+import requests  # noqa: E402
+
+
+def request_headers(access_token: str = None) -> dict:
+    headers = {'X-Request-Id': str(uuid.uuid4())}
+    if access_token:
+        headers['Authorization'] = f'Bearer {access_token}'
+    return headers
+
+
+def signup(url: str, username: str, password: str) -> str:
+    response = requests.post(
+        f'{url}/api/v1/user/signup',
+        json={
+            'username': username,
+            'password': password,
+            'email': f'{username}@example.com',
+        },
+        headers=request_headers(),
+    )
+    response.raise_for_status()
+    return response.json()['access_token']
+
+
+def probe(url: str, access_token: str, duration: float, interval: float) -> list[float]:
+    """
+    Returns the latencies of the roles requests in milliseconds.
+    """
+    latencies = []
+    deadline = time.monotonic() + duration
+    with requests.Session() as session:
+        while time.monotonic() < deadline:
+            started = time.perf_counter()
+            response = session.get(
+                f'{url}/api/v1/user/roles', headers=request_headers(access_token)
+            )
+            response.raise_for_status()
+            latencies.append((time.perf_counter() - started) * 1000)
+            gevent.sleep(interval)
+    return latencies
+
+
+def storm(
+    url: str, username: str, password: str, deadline: float, statuses: Counter
+) -> None:
+    with requests.Session() as session:
+        while time.monotonic() < deadline:
+            response = session.post(
+                f'{url}/api/v1/user/login',
+                json={'username': username, 'password': password},
+                headers=request_headers(),
+            )
+            statuses[response.status_code] += 1
+            if response.status_code == 503:
+                gevent.sleep(float(response.headers.get('Retry-After', 1)))
+
+
+def report(name: str, latencies: list[float]) -> None:
+    print(
+        f'{name:>8}: {len(latencies)} requests, '
+        f'median {statistics.median(latencies):8.2f} ms, '
+        f'p95 {statistics.quantiles(latencies, n=20)[-1]:8.2f} ms, '
+        f'max {max(latencies):8.2f} ms'
+    )
+
+
+def run(url: str, clients: int, duration: float, interval: float) -> None:
+    username = f'storm_{uuid.uuid4().hex[:8]}'
+    password = uuid.uuid4().hex
+    access_token = signup(url, username, password)
+
+    print(f'Probing {url} for {duration} s without logins...')
+    report('baseline', probe(url, access_token, duration, interval))
+
+    print(f'Probing {url} for {duration} s with {clients} clients logging in...')
+    statuses = Counter()
+    deadline = time.monotonic() + duration
+    stormers = [
+        gevent.spawn(storm, url, username, password, deadline, statuses)
+        for _ in range(clients)
+    ]
+    report('storm', probe(url, access_token, duration, interval))
+    gevent.joinall(stormers, raise_error=True)
+
+    logins = sum(statuses.values())
+    print(
+        f'{logins} logins, {statuses[200]} succeeded, '
+        f'{statuses[503]} rejected with 503 ({statuses[503] / max(logins, 1):.1%})'
+    )
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument('--url', default='http://localhost:8002')
+    parser.add_argument('--clients', type=int, default=200)
+    parser.add_argument('--duration', type=float, default=30)
+    parser.add_argument('--interval', type=float, default=0.1)
+    args = parser.parse_args()
+    run(args.url, args.clients, args.duration, args.interval)
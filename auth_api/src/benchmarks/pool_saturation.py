@@ -0,0 +1,94 @@
+"""
+Stress test of the SQLAlchemy connection pool of a worker at saturation.
+
+The given number of greenlets run queries holding a connection for `--hold` seconds through
+a pool built with the engine options of the app, so with more greenlets than
+`--pool-size + --max-overflow` the checkouts wait and, past `--pool-timeout`, fail. The
+checkout waits, the timeouts and the overflow used are reported. Run from the `src`
+directory:
+
+    python -m benchmarks.pool_saturation --greenlets 200 --pool-size 10 --max-overflow 20
+"""
+from gevent import monkey
+
+monkey.patch_all()
+
+import argparse  # noqa: E402
+import statistics  # noqa: E402
+import time  # noqa: E402
+
+import gevent  # noqa: E402
+
+from core.settings import settings  # noqa: E402
+from db.sql import get_engine_options, patch_psycopg2  # noqa: E402
+from sqlalchemy import create_engine, text  # noqa: E402
+from sqlalchemy.exc import TimeoutError  # noqa: E402
+
+
+def query(engine, hold: float, waits: list[float], errors: list[str]) -> None:
+    started = time.perf_counter()
+    try:
+        with engine.connect() as connection:
+            waits.append((time.perf_counter() - started) * 1000)
+            connection.execute(text('SELECT pg_sleep(:hold)'), {'hold': hold})
+    except TimeoutError:
+        errors.append('timeout')
+
+
+def run(dsn: str, greenlets: int, hold: float, options: dict) -> None:
+    engine = create_engine(dsn, **options)
+    waits, errors = [], []
+    print(
+        f'{greenlets} greenlets holding a connection for {hold} s, '
+        f'pool size {options.get("pool_size")}, max overflow {options.get("max_overflow")}, '
+        f'timeout {options.get("pool_timeout")} s...'
+    )
+    started = time.perf_counter()
+    gevent.joinall(
+        [gevent.spawn(query, engine, hold, waits, errors) for _ in range(greenlets)]
+    )
+    elapsed = time.perf_counter() - started
+
+    print(f'{len(waits)} queries in {elapsed:.2f} s, {len(errors)} checkout timeouts')
+    if len(waits) > 1:
+        print(
+            f'checkout wait: median {statistics.median(waits):8.2f} ms, '
+            f'p95 {statistics.quantiles(waits, n=20)[-1]:8.2f} ms, '
+            f'max {max(waits):8.2f} ms'
+        )
+    if hasattr(engine.pool, 'stats'):
+        print(f'pool: {engine.pool.stats()}')
+    engine.dispose()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument('--dsn', default=settings.sqlalchemy_database_uri)
+    parser.add_argument('--greenlets', type=int, default=200)
+    parser.add_argument('--hold', type=float, default=0.1)
+    parser.add_argument('--pool-size', type=int, default=settings.sqlalchemy_pool_size)
+    parser.add_argument(
+        '--max-overflow', type=int, default=settings.sqlalchemy_max_overflow
+    )
+    parser.add_argument(
+        '--pool-timeout', type=int, default=settings.sqlalchemy_pool_timeout
+    )
+    parser.add_argument(
+        '--unpatched',
+        action='store_true',
+        help="Don't make psycopg2 cooperative, the queries then block the event loop",
+    )
+    args = parser.parse_args()
+
+    if not args.unpatched:
+        patch_psycopg2()
+    engine_options = get_engine_options(settings)
+    if not settings.sqlalchemy_pgbouncer:
+        engine_options.update(
+            pool_size=args.pool_size,
+            max_overflow=args.max_overflow,
+            pool_timeout=args.pool_timeout,
+        )
+    run(args.dsn, args.greenlets, args.hold, engine_options)
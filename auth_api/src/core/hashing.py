@@ -0,0 +1,98 @@
+import os
+
+from http import HTTPStatus
+
+from core.settings import settings
+from flask import current_app, jsonify, make_response
+from flask_security import utils
+from gevent.threadpool import ThreadPool
+from passlib.context import CryptContext
+
+
+class PasswordHashingBusy(Exception):
+    """Raised when too many passwords are waiting to be hashed"""
+
+
+class PasswordHasher:
+    """Hashes and verifies the passwords in a bounded pool of native threads, so a hash doesn't
+    block the event loop of the process. The bcrypt backend releases the GIL while hashing, so
+    the threads run in parallel with the greenlets. Once `workers + max_queue` passwords are
+    in progress, the next ones are rejected with `PasswordHashingBusy`"""
+
+    def __init__(self, workers: int, max_queue: int):
+        self.workers = workers
+        self.max_queue = max_queue
+        self.pool = None
+        self.pid = None
+        self.in_progress = 0
+
+    def get_pool(self) -> ThreadPool:
+        # The threads of a pool don't survive a fork, so every process creates its own
+        if self.pid != os.getpid():
+            self.pid = os.getpid()
+            self.pool = ThreadPool(self.workers)
+            self.in_progress = 0
+        return self.pool
+
+    @staticmethod
+    def run_in_app_context(app, func, *args):
+        with app.app_context():
+            return func(*args)
+
+    def apply(self, func, *args):
+        pool = self.get_pool()
+        if self.in_progress >= self.workers + self.max_queue:
+            raise PasswordHashingBusy()
+        self.in_progress += 1
+        try:
+            return pool.apply(
+                self.run_in_app_context,
+                (current_app._get_current_object(), func, *args),
+            )
+        finally:
+            self.in_progress -= 1
+
+    def hash(self, password: str) -> str:
+        return self.apply(utils.hash_password, password)
+
+    def verify(self, password: str, password_hash: str) -> bool:
+        return self.apply(utils.verify_password, password, password_hash)
+
+    @staticmethod
+    def get_context() -> CryptContext:
+        return current_app.extensions['security'].pwd_context
+
+    def needs_update(self, password_hash: str) -> bool:
+        """Whether the hash has a deprecated scheme or a cost other than the configured one,
+        the check only parses the hash, so it doesn't go through the pool"""
+        return self.get_context().needs_update(password_hash)
+
+    def identify(self, password_hash: str) -> str:
+        return self.get_context().identify(password_hash)
+
+
+def get_rounds_options(scheme: str, rounds: int) -> dict:
+    """Return the passlib options hashing with the given cost,
+    the hashes of any other cost are reported by `needs_update`"""
+    return {
+        f'{scheme}__default_rounds': rounds,
+        f'{scheme}__min_desired_rounds': rounds,
+        f'{scheme}__max_desired_rounds': rounds,
+    }
+
+
+def password_hashing_busy(error: PasswordHashingBusy):
+    response = make_response(
+        jsonify(
+            error_code='SERVICE_BUSY',
+            message='Too many passwords are being checked, retry later',
+        ),
+        HTTPStatus.SERVICE_UNAVAILABLE,
+    )
+    response.headers['Retry-After'] = '1'
+    return response
+
+
+password_hasher = PasswordHasher(
+    settings.password_hash_workers, settings.password_hash_max_queue
+)
@@ -0,0 +1,249 @@
+import logging
+import os
+import random
+import signal
+import socket
+import sys
+import time
+
+from typing import Callable, Optional
+
+import gevent
+
+from gevent.pool import Pool
+from gevent.pywsgi import WSGIServer
+
+logger = logging.getLogger(__name__)
+
+# Passed by a master to the one it re-executes into on reload
+LISTENER_FD_ENV = 'PREFORK_LISTENER_FD'
+OLD_WORKERS_ENV = 'PREFORK_OLD_WORKERS'
+
+MAX_SPAWN_BACKOFF = 60
+
+
+def create_listener(host: str, port: int, backlog: int) -> socket.socket:
+    listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    listener.bind((host, port))
+    listener.listen(backlog)
+    return listener
+
+
+class PreforkServer:
+    """Serves the app from several gevent worker processes accepting on a shared socket.
+    The master process only watches the workers: a worker that exits, crashes or is recycled
+    after `max_requests` is replaced. A worker reports to the master once it accepts requests,
+    the ones exiting before are restarted with an exponential backoff.
+
+    SIGHUP reloads the server: the master re-executes itself with the same pid, so the code
+    and the settings are loaded again, the `.env` file included. The new master takes over
+    the listening socket and the running workers, starts its own workers and stops the old
+    ones once the new ones are ready, so a release failing to boot keeps the old workers
+    serving. The stopped workers finish their requests in `graceful_timeout` seconds.
+    SIGTERM and SIGINT stop the server the same way"""
+
+    def __init__(
+        self,
+        app,
+        host: str,
+        port: int,
+        workers: int,
+        worker_connections: int,
+        max_requests: int = 0,
+        max_requests_jitter: int = 0,
+        graceful_timeout: int = 30,
+        backlog: int = 2048,
+        on_worker_start: Optional[Callable[[], None]] = None,
+        on_worker_exit: Optional[Callable[[], None]] = None,
+        environ: Optional[dict] = None,
+    ):
+        self.app = app
+        self.host = host
+        self.port = port
+        self.size = workers
+        self.worker_connections = worker_connections
+        self.max_requests = max_requests
+        self.max_requests_jitter = max_requests_jitter
+        self.graceful_timeout = graceful_timeout
+        self.backlog = backlog
+        self.on_worker_start = on_worker_start
+        self.on_worker_exit = on_worker_exit
+        # The environment the master is re-executed with on reload
+        self.environ = environ if environ is not None else dict(os.environ)
+        self.listener = None
+        self.workers: set[int] = set()
+        self.ready_workers: set[int] = set()
+        self.old_workers: set[int] = set()
+        # The workers write their pid to the pipe once they accept requests
+        self.ready_reader = None
+        self.ready_writer = None
+        self.running = False
+        self.signal_watchers = []
+        self.boot_failures = 0
+        self.spawn_after = 0.0
+        # The state of the worker process
+        self.server = None
+        self.handled = 0
+        self.requests_limit = 0
+
+    def run(self) -> None:
+        self.take_over()
+        self.ready_reader, self.ready_writer = os.pipe()
+        os.set_blocking(self.ready_reader, False)
+        self.running = True
+        self.signal_watchers = [
+            gevent.signal_handler(signal.SIGTERM, self.stop),
+            gevent.signal_handler(signal.SIGINT, self.stop),
+            gevent.signal_handler(signal.SIGHUP, self.reload),
+        ]
+        logger.info(
+            'Running on %s:%s with %s workers...', self.host, self.port, self.size
+        )
+        while self.running:
+            self.read_ready_workers()
+            self.reap_workers()
+            self.spawn_workers()
+            if self.old_workers and len(self.ready_workers) >= self.size:
+                # The new workers are accepting, the old ones can go
+                self.signal_workers(list(self.old_workers), signal.SIGTERM)
+            gevent.sleep(1)
+        self.stop_workers(list(self.workers | self.old_workers))
+        self.listener.close()
+
+    def take_over(self) -> None:
+        """Adopt the listening socket and the workers of the master this one replaces,
+        or start listening if the server has just been started"""
+        listener_fd = os.environ.pop(LISTENER_FD_ENV, None)
+        if listener_fd is None:
+            self.listener = create_listener(self.host, self.port, self.backlog)
+            return
+        self.listener = socket.socket(fileno=int(listener_fd))
+        old_workers = os.environ.pop(OLD_WORKERS_ENV, '')
+        # The workers are still the children of this process, the pid is the same
+        self.old_workers = {int(pid) for pid in old_workers.split(',') if pid}
+        logger.info('Reloaded, replacing the workers %s...', sorted(self.old_workers))
+
+    def stop(self) -> None:
+        self.running = False
+
+    def reload(self) -> None:
+        logger.info('Reloading the server...')
+        for watcher in self.signal_watchers:
+            watcher.cancel()
+        os.set_inheritable(self.listener.fileno(), True)
+        environ = {
+            **self.environ,
+            LISTENER_FD_ENV: str(self.listener.fileno()),
+            OLD_WORKERS_ENV: ','.join(
+                str(pid) for pid in self.workers | self.old_workers
+            ),
+        }
+        os.execve(sys.executable, [sys.executable, *sys.argv], environ)
+
+    def spawn_workers(self) -> None:
+        if time.monotonic() < self.spawn_after:
+            return
+        for _ in range(self.size - len(self.workers)):
+            pid = gevent.fork()
+            if pid == 0:
+                self.run_worker()
+            self.workers.add(pid)
+
+    def read_ready_workers(self) -> None:
+        try:
+            data = os.read(self.ready_reader, 4096)
+        except BlockingIOError:
+            return
+        for pid in map(int, data.split()):
+            if pid in self.workers:
+                self.ready_workers.add(pid)
+                self.boot_failures = 0
+
+    def reap_workers(self) -> None:
+        for pid in self.workers | self.old_workers:
+            try:
+                reaped, status = os.waitpid(pid, os.WNOHANG)
+            except ChildProcessError:
+                reaped, status = pid, 0
+            if not reaped:
+                continue
+            if status:
+                logger.warning('Worker %s exited with status %s', pid, status)
+            # The workers of a round failing together back off once
+            booting = pid in self.workers and pid not in self.ready_workers
+            if booting and time.monotonic() >= self.spawn_after:
+                self.boot_failures += 1
+                backoff = min(2**self.boot_failures, MAX_SPAWN_BACKOFF)
+                self.spawn_after = time.monotonic() + backoff
+                logger.warning('Workers fail to boot, retrying in %s s', backoff)
+            self.workers.discard(pid)
+            self.ready_workers.discard(pid)
+            self.old_workers.discard(pid)
+
+    def signal_workers(self, pids: list[int], signum: int) -> None:
+        for pid in pids:
+            try:
+                os.kill(pid, signum)
+            except ProcessLookupError:
+                pass
+
+    def stop_workers(self, pids: list[int]) -> None:
+        self.signal_workers(pids, signal.SIGTERM)
+        # The workers get a moment more than their own timeout to flush what they buffer
+        deadline = time.monotonic() + self.graceful_timeout + 5
+        while (self.workers or self.old_workers) and time.monotonic() < deadline:
+            self.reap_workers()
+            gevent.sleep(0.1)
+        self.signal_workers(list(self.workers | self.old_workers), signal.SIGKILL)
+
+    def run_worker(self) -> None:
+        """Serve the requests in the forked process until it is stopped, then exit"""
+        status = 0
+        try:
+            # The signal handlers of the master are inherited by the fork
+            for watcher in self.signal_watchers:
+                watcher.cancel()
+            signal.signal(signal.SIGHUP, signal.SIG_IGN)
+            gevent.signal_handler(signal.SIGTERM, self.stop_worker)
+            gevent.signal_handler(signal.SIGINT, self.stop_worker)
+
+            if self.on_worker_start:
+                self.on_worker_start()
+            self.server = WSGIServer(
+                self.listener,
+                self.count_requests(self.app),
+                spawn=Pool(self.worker_connections),
+            )
+            self.server.start()
+            os.close(self.ready_reader)
+            os.write(self.ready_writer, f'{os.getpid()}\n'.encode())
+            # The limits are spread, so the workers aren't recycled all at once
+            self.requests_limit = self.max_requests and (
+                self.max_requests + random.randint(0, self.max_requests_jitter)
+            )
+            self.server.serve_forever(stop_timeout=self.graceful_timeout)
+            if self.on_worker_exit:
+                self.on_worker_exit()
+        except Exception:
+            logger.exception('Worker %s failed', os.getpid())
+            status = 1
+        finally:
+            # The code of the master after the fork must not run in the worker
+            os._exit(status)
+
+    def stop_worker(self) -> None:
+        if self.server and not self.server.closed:
+            self.server.stop(timeout=self.graceful_timeout)
+
+    def count_requests(self, app):
+        """Stop the worker once it has handled its share of requests, so it is recycled"""
+
+        def application(environ, start_response):
+            self.handled += 1
+            if self.handled == self.requests_limit:
+                logger.info('Recycling worker %s...', os.getpid())
+                gevent.spawn(self.stop_worker)
+            return app(environ, start_response)
+
+        return application
@@ -1,16 +1,134 @@
+import threading
+import time
+
 from contextlib import contextmanager
 
-from core.settings import settings
+import psycopg2
+
+from core.settings import Settings, settings
 from flask_migrate import Migrate
 from flask_sqlalchemy import SQLAlchemy
+from gevent.socket import wait_read, wait_write
+from psycopg2 import extensions
 from sqlalchemy import DDL, MetaData, create_engine
+from sqlalchemy.exc import TimeoutError
+from sqlalchemy.pool import NullPool, QueuePool
+
+
+def gevent_wait_callback(connection, timeout=None):
+    """Wait for the socket of the connection in the event loop instead of blocking it"""
+    while True:
+        state = connection.poll()
+        if state == extensions.POLL_OK:
+            break
+        if state == extensions.POLL_READ:
+            wait_read(connection.fileno(), timeout=timeout)
+        elif state == extensions.POLL_WRITE:
+            wait_write(connection.fileno(), timeout=timeout)
+        else:
+            raise psycopg2.OperationalError(f'Bad result from poll: {state}')
+
+
+def patch_psycopg2() -> None:
+    """Make psycopg2 cooperative with gevent, call it once the process is monkey patched"""
+    extensions.set_wait_callback(gevent_wait_callback)
+
+
+class InstrumentedQueuePool(QueuePool):
+    """Measures how long the checkouts wait for a free connection, the time spent opening
+    the new connections is reported apart. The metrics are kept per process, a pool
+    recreated after a fork starts them over"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_time = 0.0
+        self.max_wait_time = 0.0
+        self.max_overflow_used = 0
+        self.connects = 0
+        self.connect_time = 0.0
+        # The checkout in progress in the greenlet, `_do_get` calls itself on a race
+        self.checkout = threading.local()
+
+    def _do_get(self):
+        if getattr(self.checkout, 'started', None) is not None:
+            return super()._do_get()
+        self.checkout.started = time.perf_counter()
+        self.checkout.connect_time = 0.0
+        try:
+            connection = super()._do_get()
+        except TimeoutError:
+            self.timeouts += 1
+            raise
+        finally:
+            elapsed = time.perf_counter() - self.checkout.started
+            self.checkout.started = None
+            waited = elapsed - self.checkout.connect_time
+            self.wait_time += waited
+            self.max_wait_time = max(self.max_wait_time, waited)
+        self.checkouts += 1
+        self.max_overflow_used = max(self.max_overflow_used, self.overflow())
+        return connection
+
+    def _create_connection(self):
+        started = time.perf_counter()
+        try:
+            return super()._create_connection()
+        finally:
+            elapsed = time.perf_counter() - started
+            self.connects += 1
+            self.connect_time += elapsed
+            if getattr(self.checkout, 'started', None) is not None:
+                self.checkout.connect_time += elapsed
+
+    def stats(self) -> dict:
+        attempts = max(self.checkouts + self.timeouts, 1)
+        return {
+            'size': self.size(),
+            'checked_in': self.checkedin(),
+            'checked_out': self.checkedout(),
+            'overflow': max(self.overflow(), 0),
+            'max_overflow_used': max(self.max_overflow_used, 0),
+            'checkouts': self.checkouts,
+            'timeouts': self.timeouts,
+            'avg_wait_ms': self.wait_time * 1000 / attempts,
+            'max_wait_ms': self.max_wait_time * 1000,
+            'connects': self.connects,
+            'avg_connect_ms': self.connect_time * 1000 / max(self.connects, 1),
+        }
+
+
+def get_engine_options(app_settings: Settings) -> dict:
+    if app_settings.sqlalchemy_pgbouncer:
+        # PgBouncer pools the server connections, so the app doesn't keep any of them.
+        # psycopg2 interpolates the parameters on the client, it never prepares
+        # statements on the server, which a transaction pooler couldn't route
+        return {'poolclass': NullPool}
+    return {
+        'poolclass': InstrumentedQueuePool,
+        'pool_size': app_settings.sqlalchemy_pool_size,
+        'max_overflow': app_settings.sqlalchemy_max_overflow,
+        'pool_timeout': app_settings.sqlalchemy_pool_timeout,
+        'pool_recycle': app_settings.sqlalchemy_pool_recycle,
+        'pool_pre_ping': app_settings.sqlalchemy_pool_pre_ping,
+    }
 
 
 class DatabaseManager:
     def __init__(self):
-        self.db = SQLAlchemy(metadata=MetaData(schema=settings.postgres_schema))
+        self.db = SQLAlchemy(
+            metadata=MetaData(schema=settings.postgres_schema),
+            engine_options=get_engine_options(settings),
+        )
         self.migration = Migrate()
 
+    def get_pool_stats(self) -> dict:
+        pool = self.db.engine.pool
+        if isinstance(pool, InstrumentedQueuePool):
+            return pool.stats()
+        return {'status': pool.status()}
+
     @staticmethod
     def create_schema_if_not_exists(database_uri, schema_name):
         engine = create_engine(database_uri)
@@ -12,4 +12,4 @@ wait_for_postgres() {
 wait_for_postgres
 
 flask db upgrade
-python manage.py runserver
+exec python manage.py serve
@@ -1,8 +1,11 @@
+from datetime import timedelta
+
 from api.common import api
 from apispec import APISpec
 from apispec_webframeworks.flask import FlaskPlugin
 from core import documentation
 from core.containers import Container
+from core.hashing import PasswordHashingBusy, get_rounds_options, password_hashing_busy
 from core.security_setup import setup_user_datastore
 from core.settings import settings
 from core.tracer_setup import setup_tracer
@@ -36,9 +39,14 @@ def setup_app(app, app_settings):
         'SQLALCHEMY_TRACK_MODIFICATIONS'
     ] = app_settings.sqlalchemy_track_modifications
     app.config['JWT_SECRET_KEY'] = app_settings.jwt_secret_key
+    app.config['JWT_REFRESH_TOKEN_EXPIRES'] = timedelta(
+        seconds=app_settings.jwt_refresh
+    )
 
     JWTManager(app)
 
+    app.register_error_handler(PasswordHashingBusy, password_hashing_busy)
+
     app.before_request(before_request)
 
 
@@ -50,6 +58,11 @@ def setup_database(app):
 def setup_security(app, app_settings):
     app.config['SECURITY_PASSWORD_SALT'] = app_settings.security_password_salt
     app.config['SECURITY_PASSWORD_HASH'] = app_settings.security_password_hash
+    if app_settings.security_password_hash_rounds:
+        app.config['SECURITY_PASSWORD_HASH_PASSLIB_OPTIONS'] = get_rounds_options(
+            app_settings.security_password_hash,
+            app_settings.security_password_hash_rounds,
+        )
     setup_user_datastore(app)
 
 
@@ -2,17 +2,40 @@ from gevent import monkey
 
 monkey.patch_all()
 
+import logging
+import signal
+import statistics
+import time
+
+from collections import Counter
+from datetime import date, datetime, timezone
+
 import click
+import gevent
 
+from core.hashing import password_hasher
+from core.prefork import PreforkServer
 from core.security_setup import user_datastore
-from core.settings import settings
-from db.sql import db_manager
+from core.settings import ENVIRON, settings
+from db.redis import redis
+from db.sql import db_manager, patch_psycopg2
 from flask.cli import with_appcontext
 from gevent.pywsgi import WSGIServer
 from main import create_app
-from models.models import Role
-from sqlalchemy.exc import IntegrityError
+from models.create_partitions import (
+    create_range_partition_from_default,
+    drop_partitions_before,
+    get_periods,
+    partition_bounds,
+)
+from models.models import Role, User
+from passlib.registry import get_crypt_handler
+from services.auth_history import auth_history_writer
+from services.user import password_upgrades_key
+from sqlalchemy import select, text
+from sqlalchemy.exc import DBAPIError, IntegrityError
 
+patch_psycopg2()
 app = create_app()
 
 
@@ -24,10 +47,50 @@ def cli():
 @cli.command()
 def runserver():
     http_server = WSGIServer((settings.flask_host, settings.flask_port), app)
+    # Stop gracefully, so the buffered auth history events are flushed
+    gevent.signal_handler(signal.SIGTERM, http_server.stop)
     http_server.serve_forever()
+    auth_history_writer.close()
     print(f'Running on {settings.flask_host}:{settings.flask_port}...')
 
 
+def dispose_engine() -> None:
+    """Drop the connections inherited from the master, every worker opens its own"""
+    with app.app_context():
+        db_manager.db.engine.dispose(close=False)
+
+
+@cli.command()
+@click.option('--workers', default=settings.server_workers, help='Worker processes')
+@click.option(
+    '--worker-connections',
+    default=settings.server_worker_connections,
+    help='Requests served at once by a worker',
+)
+@click.option(
+    '--max-requests',
+    default=settings.server_max_requests,
+    help='Requests after which a worker is replaced, never if 0',
+)
+def serve(workers: int, worker_connections: int, max_requests: int) -> None:
+    """Run the production server, send SIGHUP to reload the code and the settings"""
+    logging.basicConfig(level=logging.INFO)
+    PreforkServer(
+        app,
+        settings.flask_host,
+        settings.flask_port,
+        workers=workers,
+        worker_connections=worker_connections,
+        max_requests=max_requests,
+        max_requests_jitter=settings.server_max_requests_jitter,
+        graceful_timeout=settings.server_graceful_timeout,
+        backlog=settings.server_backlog,
+        on_worker_start=dispose_engine,
+        on_worker_exit=auth_history_writer.close,
+        environ=ENVIRON,
+    ).run()
+
+
 @click.command()
 @click.option('--role', required=True, help='A custom role name to be created.')
 @click.option('--description', required=True, help='A description for the custom role.')
@@ -62,8 +125,227 @@ def create_superuser(username: str, password: str) -> None:
         )
 
 
+def create_upcoming_partitions(
+    table: str, start: date, count: int, period: str
+) -> None:
+    """Create the partitions of the upcoming periods, each one in its own transaction.
+    The rows of a period already in the default partition are moved to its partition,
+    the command fails if any of the partitions couldn't be created"""
+    failed = []
+    for period_date in get_periods(start, count, period):
+        name, period_start, period_end = partition_bounds(table, period_date, period)
+        try:
+            with db_manager.db.engine.begin() as connection:
+                moved = create_range_partition_from_default(
+                    connection, table, name, period_start, period_end
+                )
+        except DBAPIError as e:
+            click.echo(message=f'Failed to create partition "{name}": {e.orig}')
+            failed.append(name)
+            continue
+        if moved:
+            click.echo(
+                message=f'Moved {moved} rows of the default partition to "{name}".'
+            )
+    if failed:
+        raise click.ClickException(f'Failed to create partitions {", ".join(failed)}')
+
+
+def purge_expired_tokens(batch_size: int) -> None:
+    """Create the partitions of the upcoming days, drop the expired ones
+    and delete the expired tokens of the default partition in batches"""
+    engine = db_manager.db.engine
+    today = datetime.now(timezone.utc).date()
+
+    create_upcoming_partitions('tokens', today, settings.tokens_partitions_ahead, 'day')
+    with engine.begin() as connection:
+        dropped = drop_partitions_before(connection, 'tokens', today, 'day')
+
+    deleted = 0
+    while True:
+        with engine.begin() as connection:
+            result = connection.execute(
+                text(
+                    f"""DELETE FROM {settings.postgres_schema}.tokens_default
+                    WHERE ctid IN (
+                        SELECT ctid FROM {settings.postgres_schema}.tokens_default
+                        WHERE expires_at <= now() LIMIT :batch_size
+                    );"""
+                ),
+                {'batch_size': batch_size},
+            )
+        deleted += result.rowcount
+        if result.rowcount < batch_size:
+            break
+
+    click.echo(
+        message=f'Dropped {len(dropped)} expired partitions, '
+        f'deleted {deleted} expired tokens from the default partition.'
+    )
+
+
+@cli.command()
+@click.option(
+    '--batch-size',
+    default=settings.tokens_purge_batch_size,
+    help='Expired tokens deleted from the default partition per transaction',
+)
+@click.option(
+    '--interval',
+    default=0,
+    help='Repeat the purge every given number of seconds, run it once if 0',
+)
+@with_appcontext
+def purge_tokens(batch_size: int, interval: int) -> None:
+    while True:
+        purge_expired_tokens(batch_size)
+        if not interval:
+            break
+        time.sleep(interval)
+
+
+@cli.command()
+@click.option(
+    '--retention',
+    default=settings.auth_history_retention_months,
+    help='Months of auth history to keep, besides the current one',
+)
+@click.option(
+    '--detach',
+    is_flag=True,
+    help='Detach the old partitions and keep them as tables instead of dropping them',
+)
+@click.option(
+    '--interval',
+    default=0,
+    help='Repeat the maintenance every given number of seconds, run it once if 0',
+)
+@with_appcontext
+def maintain_auth_history(retention: int, detach: bool, interval: int) -> None:
+    """Create the auth history partitions of the upcoming months
+    and remove the ones older than the retention period"""
+    while True:
+        this_month = datetime.now(timezone.utc).date().replace(day=1)
+        create_upcoming_partitions(
+            'auth_history',
+            this_month,
+            settings.auth_history_partitions_ahead + 1,
+            'month',
+        )
+        month_index = this_month.year * 12 + this_month.month - 1 - retention
+        oldest_month = date(month_index // 12, month_index % 12 + 1, 1)
+        with db_manager.db.engine.begin() as connection:
+            removed = drop_partitions_before(
+                connection, 'auth_history', oldest_month, 'month', detach=detach
+            )
+        click.echo(
+            message=f'{"Detached" if detach else "Dropped"} {len(removed)} auth history '
+            f'partitions older than {oldest_month:%Y-%m}: {", ".join(removed) or "none"}.'
+        )
+        if not interval:
+            break
+        time.sleep(interval)
+
+
+def measure_hash(handler, rounds: int, samples: int) -> float:
+    """Return the median time of hashing a password with the cost in milliseconds"""
+    hasher = handler.using(rounds=rounds)
+    timings = []
+    for _ in range(samples):
+        started = time.perf_counter()
+        hasher.hash('calibration password')
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings)
+
+
+@cli.command()
+@click.option(
+    '--target-ms',
+    default=250.0,
+    help='The time a single password hash should take, in milliseconds',
+)
+@click.option('--samples', default=3, help='Hashes measured for every cost')
+def calibrate_password_hash(target_ms: float, samples: int) -> None:
+    """Find the highest cost of the password hash scheme fitting the target time
+    on this host"""
+    handler = get_crypt_handler(settings.security_password_hash)
+    if 'rounds' not in handler.setting_kwds:
+        click.echo(message=f'The "{handler.name}" scheme has no configurable cost.')
+        return
+
+    current = settings.security_password_hash_rounds or handler.default_rounds
+    click.echo(
+        message=f'{handler.name}: cost {current} takes '
+        f'{measure_hash(handler, current, samples):.1f} ms now.'
+    )
+
+    if handler.rounds_cost == 'log2':
+        # Every next cost doubles the time
+        rounds = handler.min_rounds
+        elapsed = measure_hash(handler, rounds, samples)
+        while rounds < handler.max_rounds and elapsed * 2 <= target_ms:
+            rounds += 1
+            elapsed = measure_hash(handler, rounds, samples)
+    else:
+        # The fixed overhead of a hash dominates a small cost, so the cost is scaled from
+        # the default one and measured again until the time is within 5% of the target
+        rounds = handler.default_rounds
+        elapsed = measure_hash(handler, rounds, samples)
+        for _ in range(10):
+            if abs(elapsed - target_ms) <= target_ms * 0.05:
+                break
+            scaled = max(handler.min_rounds, int(rounds * target_ms / elapsed))
+            if handler.max_rounds:
+                scaled = min(scaled, handler.max_rounds)
+            if scaled == rounds:
+                break
+            rounds = scaled
+            elapsed = measure_hash(handler, rounds, samples)
+
+    click.echo(
+        message=f'{handler.name}: cost {rounds} takes {elapsed:.1f} ms, '
+        f'{settings.password_hash_workers} hashing workers check about '
+        f'{settings.password_hash_workers * 1000 / elapsed:.0f} passwords/s.\n'
+        f'Set SECURITY_PASSWORD_HASH_ROUNDS={rounds}, '
+        'the stale hashes are upgraded as the users log in.'
+    )
+
+
+@cli.command()
+@click.option('--batch-size', default=1000, help='Users loaded per query')
+@with_appcontext
+def password_hash_status(batch_size: int) -> None:
+    """Show how many password hashes are up to date with the configured scheme and cost"""
+    stale = Counter()
+    total = 0
+    password_hashes = db_manager.db.session.scalars(
+        select(User.password).execution_options(yield_per=batch_size)
+    )
+    for password_hash in password_hashes:
+        total += 1
+        if password_hasher.needs_update(password_hash):
+            stale[password_hasher.identify(password_hash)] += 1
+
+    upgraded = {
+        scheme.decode(): int(count)
+        for scheme, count in redis.hgetall(password_upgrades_key()).items()
+    }
+    up_to_date = total - sum(stale.values())
+    click.echo(
+        message=f'{up_to_date} of {total} password hashes are up to date '
+        f'({up_to_date / max(total, 1):.1%}).\n'
+        f'Stale hashes by scheme: {dict(stale) or "none"}.\n'
+        f'Upgraded on login by scheme: {upgraded or "none"}.'
+    )
+
+
+cli.add_command(serve)
 cli.add_command(create_superuser)
 cli.add_command(create_role)
+cli.add_command(purge_tokens)
+cli.add_command(maintain_auth_history)
+cli.add_command(calibrate_password_hash)
+cli.add_command(password_hash_status)
 
 if __name__ == "__main__":
     cli()
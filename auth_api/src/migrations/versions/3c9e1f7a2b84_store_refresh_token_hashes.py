@@ -0,0 +1,54 @@
+"""Store refresh token hashes
+
+Revision ID: 3c9e1f7a2b84
+Revises: 6a6f5318432d
+Create Date: 2023-05-02 18:41:12.503217
+
+"""
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '3c9e1f7a2b84'
+down_revision = '6a6f5318432d'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column(
+        'tokens',
+        sa.Column('token_hash', sa.String(length=64), nullable=True),
+        schema='content',
+    )
+    op.execute(
+        """UPDATE content.tokens
+        SET token_hash = encode(sha256(convert_to(token_value, 'UTF8')), 'hex');"""
+    )
+    # Keep a single row per token, so the unique index can be built
+    op.execute(
+        """DELETE FROM content.tokens t USING content.tokens d
+        WHERE t.token_hash = d.token_hash AND t.id < d.id;"""
+    )
+    op.alter_column('tokens', 'token_hash', nullable=False, schema='content')
+    op.create_index(
+        'ix_tokens_token_hash',
+        'tokens',
+        ['token_hash'],
+        unique=True,
+        schema='content',
+    )
+    op.drop_column('tokens', 'token_value', schema='content')
+
+
+def downgrade():
+    # The tokens can't be restored from their hashes, so the users have to log in again
+    op.execute('DELETE FROM content.tokens;')
+    op.drop_index('ix_tokens_token_hash', table_name='tokens', schema='content')
+    op.drop_column('tokens', 'token_hash', schema='content')
+    op.add_column(
+        'tokens',
+        sa.Column('token_value', sa.Text(), nullable=False),
+        schema='content',
+    )
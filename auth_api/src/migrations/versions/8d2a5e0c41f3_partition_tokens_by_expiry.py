@@ -0,0 +1,111 @@
+"""Partition tokens by expiry
+
+Revision ID: 8d2a5e0c41f3
+Revises: 3c9e1f7a2b84
+Create Date: 2023-05-04 11:02:47.918302
+
+"""
+from datetime import datetime, time, timedelta, timezone
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '8d2a5e0c41f3'
+down_revision = '3c9e1f7a2b84'
+branch_labels = None
+depends_on = None
+
+# The state of the settings and of the partitions at the time of the revision,
+# a migration must not change with them
+SCHEMA = 'content'
+REFRESH_TOKEN_EXPIRES = 32312
+PARTITIONS_AHEAD = 7
+
+
+def create_tokens_table(*constraints, **kw):
+    op.create_table(
+        'tokens',
+        sa.Column('token_owner_id', sa.UUID(), nullable=False),
+        sa.Column('token_hash', sa.String(length=64), nullable=False),
+        sa.Column('token_used', sa.Boolean(), nullable=True),
+        sa.Column(
+            'created_at',
+            sa.DateTime(timezone=True),
+            server_default=sa.text('now()'),
+            nullable=True,
+        ),
+        sa.Column('expires_at', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('id', sa.UUID(), nullable=False),
+        sa.ForeignKeyConstraint(
+            ['token_owner_id'],
+            [f'{SCHEMA}.users.id'],
+        ),
+        *constraints,
+        schema=SCHEMA,
+        **kw,
+    )
+
+
+def create_daily_partitions():
+    op.execute(
+        f"""CREATE TABLE IF NOT EXISTS {SCHEMA}.tokens_default
+        PARTITION OF {SCHEMA}.tokens DEFAULT;"""
+    )
+    today = datetime.now(timezone.utc).date()
+    for days in range(PARTITIONS_AHEAD):
+        day = today + timedelta(days=days)
+        start = datetime.combine(day, time.min, tzinfo=timezone.utc)
+        end = start + timedelta(days=1)
+        op.execute(
+            f"""CREATE TABLE IF NOT EXISTS {SCHEMA}.tokens_{day:%Y%m%d}
+            PARTITION OF {SCHEMA}.tokens
+            FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}');"""
+        )
+
+
+def upgrade():
+    # The tokens were stored with a placeholder expiry, it is estimated from their creation time
+    op.execute(
+        f"""CREATE TEMPORARY TABLE tokens_backup ON COMMIT DROP AS
+        SELECT token_owner_id, token_hash, token_used, created_at,
+            created_at + make_interval(secs => {REFRESH_TOKEN_EXPIRES}) AS expires_at, id
+        FROM {SCHEMA}.tokens
+        WHERE created_at + make_interval(secs => {REFRESH_TOKEN_EXPIRES}) > now();"""
+    )
+    op.drop_table('tokens', schema=SCHEMA)
+
+    create_tokens_table(
+        sa.PrimaryKeyConstraint('id', 'expires_at'),
+        postgresql_partition_by='RANGE (expires_at)',
+    )
+    op.create_index(
+        'ix_tokens_token_hash',
+        'tokens',
+        ['token_hash', 'expires_at'],
+        unique=True,
+        schema=SCHEMA,
+    )
+    create_daily_partitions()
+
+    op.execute(f'INSERT INTO {SCHEMA}.tokens SELECT * FROM tokens_backup;')
+
+
+def downgrade():
+    op.execute(
+        f"""CREATE TEMPORARY TABLE tokens_backup ON COMMIT DROP AS
+        SELECT * FROM {SCHEMA}.tokens;"""
+    )
+    op.drop_table('tokens', schema=SCHEMA)
+
+    create_tokens_table(sa.PrimaryKeyConstraint('id'), sa.UniqueConstraint('id'))
+    op.create_index(
+        'ix_tokens_token_hash',
+        'tokens',
+        ['token_hash'],
+        unique=True,
+        schema=SCHEMA,
+    )
+
+    op.execute(f'INSERT INTO {SCHEMA}.tokens SELECT * FROM tokens_backup;')
@@ -0,0 +1,155 @@
+"""Partition auth history by month
+
+Revision ID: e5b7c9d1a3f6
+Revises: 8d2a5e0c41f3
+Create Date: 2023-05-06 16:27:09.341856
+
+"""
+from datetime import date, datetime, time, timezone
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = 'e5b7c9d1a3f6'
+down_revision = '8d2a5e0c41f3'
+branch_labels = None
+depends_on = None
+
+# The state of the settings and of the partitions at the time of the revision,
+# a migration must not change with them
+SCHEMA = 'content'
+PARTITIONS_AHEAD = 3
+
+COLUMNS = (
+    'user_id, ip_address, user_agent, is_successful, device, auth_event_type, '
+    'auth_event_time, auth_event_fingerprint, id, created_at, updated_at'
+)
+
+DEVICES = ('desktop', 'tablet', 'mobile', 'other')
+
+
+def create_auth_history_table(auth_event_time_nullable, *constraints, **kw):
+    op.create_table(
+        'auth_history',
+        sa.Column('user_id', sa.UUID(), nullable=True),
+        sa.Column('ip_address', sa.String(length=50), nullable=False),
+        sa.Column('user_agent', sa.String(length=255), nullable=False),
+        sa.Column('is_successful', sa.Boolean(), nullable=False),
+        sa.Column('device', sa.String(length=255), nullable=False),
+        sa.Column('auth_event_type', sa.String(length=50), nullable=False),
+        sa.Column(
+            'auth_event_time',
+            sa.DateTime(timezone=True),
+            server_default=sa.text('now()'),
+            nullable=auth_event_time_nullable,
+        ),
+        sa.Column('auth_event_fingerprint', sa.String(length=255), nullable=False),
+        sa.Column('id', sa.UUID(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(
+            ['user_id'], [f'{SCHEMA}.users.id'], ondelete='CASCADE'
+        ),
+        *constraints,
+        schema=SCHEMA,
+        **kw,
+    )
+
+
+def next_month(month: date) -> date:
+    return date(month.year + month.month // 12, month.month % 12 + 1, 1)
+
+
+def create_monthly_partitions(start: date, count: int):
+    op.execute(
+        f"""CREATE TABLE IF NOT EXISTS {SCHEMA}.auth_history_default
+        PARTITION OF {SCHEMA}.auth_history DEFAULT;"""
+    )
+    month = start.replace(day=1)
+    for _ in range(count):
+        end = next_month(month)
+        op.execute(
+            f"""CREATE TABLE IF NOT EXISTS {SCHEMA}.auth_history_{month:%Y%m}
+            PARTITION OF {SCHEMA}.auth_history FOR VALUES
+            FROM ('{datetime.combine(month, time.min, tzinfo=timezone.utc).isoformat()}')
+            TO ('{datetime.combine(end, time.min, tzinfo=timezone.utc).isoformat()}');"""
+        )
+        month = end
+
+
+def upgrade():
+    op.rename_table('auth_history', 'auth_history_legacy', schema=SCHEMA)
+    op.execute(
+        f"""ALTER TABLE {SCHEMA}.auth_history_legacy
+        RENAME CONSTRAINT auth_history_pkey TO auth_history_legacy_pkey;"""
+    )
+
+    create_auth_history_table(
+        False,
+        sa.PrimaryKeyConstraint('id', 'auth_event_time'),
+        postgresql_partition_by='RANGE (auth_event_time)',
+    )
+    op.create_index(
+        'ix_auth_history_user_id_auth_event_time',
+        'auth_history',
+        ['user_id', 'auth_event_time'],
+        schema=SCHEMA,
+    )
+
+    # Cover the whole history, the partitions past the retention are removed by
+    # `manage.py maintain_auth_history`
+    oldest_event_time = (
+        op.get_bind()
+        .execute(
+            sa.text(
+                f"""SELECT min(coalesce(auth_event_time, created_at))
+                FROM {SCHEMA}.auth_history_legacy;"""
+            )
+        )
+        .scalar()
+    )
+    now = datetime.now(timezone.utc)
+    start = (oldest_event_time or now).date()
+    months = (now.year - start.year) * 12 + now.month - start.month
+    create_monthly_partitions(start, months + PARTITIONS_AHEAD + 1)
+
+    op.execute(
+        f"""INSERT INTO {SCHEMA}.auth_history ({COLUMNS})
+        SELECT user_id, ip_address, user_agent, is_successful, device, auth_event_type,
+            coalesce(auth_event_time, created_at, now()), auth_event_fingerprint, id,
+            created_at, updated_at
+        FROM {SCHEMA}.auth_history_legacy;"""
+    )
+    op.drop_table('auth_history_legacy', schema=SCHEMA)
+
+
+def downgrade():
+    op.rename_table('auth_history', 'auth_history_ranged', schema=SCHEMA)
+    op.execute(
+        f"""ALTER TABLE {SCHEMA}.auth_history_ranged
+        RENAME CONSTRAINT auth_history_pkey TO auth_history_ranged_pkey;"""
+    )
+
+    create_auth_history_table(
+        True,
+        sa.PrimaryKeyConstraint('id', 'device'),
+        postgresql_partition_by='LIST (device)',
+    )
+    for device in DEVICES:
+        op.execute(
+            f"""CREATE TABLE IF NOT EXISTS {SCHEMA}.auth_history_{device} PARTITION OF {SCHEMA}.auth_history
+            FOR VALUES IN ('{device}');"""
+        )
+
+    op.execute(
+        f"""INSERT INTO {SCHEMA}.auth_history ({COLUMNS})
+        SELECT user_id, ip_address, user_agent, is_successful,
+            CASE WHEN device IN ({", ".join(f"'{device}'" for device in DEVICES)})
+                THEN device ELSE 'other' END,
+            auth_event_type, auth_event_time, auth_event_fingerprint, id,
+            created_at, updated_at
+        FROM {SCHEMA}.auth_history_ranged;"""
+    )
+    op.drop_table('auth_history_ranged', schema=SCHEMA)
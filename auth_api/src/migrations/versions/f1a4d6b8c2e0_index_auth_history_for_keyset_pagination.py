@@ -0,0 +1,45 @@
+"""Index auth history for keyset pagination
+
+Revision ID: f1a4d6b8c2e0
+Revises: e5b7c9d1a3f6
+Create Date: 2023-05-08 10:14:55.602713
+
+"""
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = 'f1a4d6b8c2e0'
+down_revision = 'e5b7c9d1a3f6'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index(
+        'ix_auth_history_user_id_time_id',
+        'auth_history',
+        ['user_id', sa.text('auth_event_time DESC'), sa.text('id DESC')],
+        schema='content',
+    )
+    # The new index has the same leading columns
+    op.drop_index(
+        'ix_auth_history_user_id_auth_event_time',
+        table_name='auth_history',
+        schema='content',
+    )
+
+
+def downgrade():
+    op.create_index(
+        'ix_auth_history_user_id_auth_event_time',
+        'auth_history',
+        ['user_id', 'auth_event_time'],
+        schema='content',
+    )
+    op.drop_index(
+        'ix_auth_history_user_id_time_id',
+        table_name='auth_history',
+        schema='content',
+    )
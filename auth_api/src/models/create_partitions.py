@@ -1,17 +1,176 @@
-def create_partition_auth_history(target, connection, **kw) -> None:
+from datetime import date, datetime, time, timedelta, timezone
+
+from core.settings import settings
+from sqlalchemy import text
+
+# The suffixes of the names of the partitions of a period
+PARTITION_SUFFIXES = {'day': '%Y%m%d', 'month': '%Y%m'}
+# The partition keys of the range partitioned tables
+PARTITION_KEYS = {'auth_history': 'auth_event_time', 'tokens': 'expires_at'}
+
+
+def period_start(day: date, period: str) -> date:
+    return day.replace(day=1) if period == 'month' else day
+
+
+def next_period(start: date, period: str) -> date:
+    if period == 'month':
+        return (start.replace(day=1) + timedelta(days=32)).replace(day=1)
+    return start + timedelta(days=1)
+
+
+def partition_bounds(
+    table: str, start: date, period: str
+) -> tuple[str, datetime, datetime]:
+    """Return the name and the UTC bounds of the partition of the period starting at the date"""
+    name = f'{table}_{start.strftime(PARTITION_SUFFIXES[period])}'
+    return (
+        name,
+        datetime.combine(start, time.min, tzinfo=timezone.utc),
+        datetime.combine(next_period(start, period), time.min, tzinfo=timezone.utc),
+    )
+
+
+def create_range_partition(
+    connection, table: str, name: str, start: datetime, end: datetime
+) -> None:
     connection.execute(
-        """CREATE TABLE IF NOT EXISTS auth_history_desktop PARTITION OF content.auth_history FOR VALUES IN (
-        'desktop');"""
+        text(
+            f"""CREATE TABLE IF NOT EXISTS {settings.postgres_schema}.{name}
+            PARTITION OF {settings.postgres_schema}.{table}
+            FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}');"""
+        )
     )
+
+
+def create_range_partition_from_default(
+    connection, table: str, name: str, start: datetime, end: datetime
+) -> int:
+    """Create the partition unless it exists, moving the rows of its range out of the default
+    partition, which a missed run leaves there and which would keep the partition from being
+    created. The new partition is filled before it is attached, all in the transaction of
+    the connection. Returns the number of rows moved"""
+    schema = settings.postgres_schema
+    exists = connection.execute(
+        text('SELECT to_regclass(:name);'), {'name': f'{schema}.{name}'}
+    ).scalar()
+    if exists:
+        return 0
+    key = PARTITION_KEYS[table]
     connection.execute(
-        """CREATE TABLE IF NOT EXISTS auth_history_tablet PARTITION OF content.auth_history FOR VALUES IN (
-        'tablet');"""
+        text(
+            f"""CREATE TABLE {schema}.{name}
+            (LIKE {schema}.{table} INCLUDING DEFAULTS INCLUDING CONSTRAINTS);"""
+        )
     )
+    moved = connection.execute(
+        text(
+            f"""WITH moved AS (
+                DELETE FROM {schema}.{table}_default
+                WHERE {key} >= :start AND {key} < :end
+                RETURNING *
+            )
+            INSERT INTO {schema}.{name} SELECT * FROM moved;"""
+        ),
+        {'start': start, 'end': end},
+    ).rowcount
     connection.execute(
-        """CREATE TABLE IF NOT EXISTS auth_history_mobile PARTITION OF content.auth_history FOR VALUES IN (
-        'mobile');"""
+        text(
+            f"""ALTER TABLE {schema}.{table} ATTACH PARTITION {schema}.{name}
+            FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}');"""
+        )
     )
+    return moved
+
+
+def create_default_partition(connection, table: str) -> None:
     connection.execute(
-        """CREATE TABLE IF NOT EXISTS auth_history_other PARTITION OF content.auth_history FOR VALUES IN (
-        'other');"""
+        text(
+            f"""CREATE TABLE IF NOT EXISTS {settings.postgres_schema}.{table}_default
+            PARTITION OF {settings.postgres_schema}.{table} DEFAULT;"""
+        )
+    )
+
+
+def get_periods(start: date, count: int, period: str) -> list[date]:
+    """Return the starts of the periods, beginning with the period of the date"""
+    periods = [period_start(start, period)]
+    while len(periods) < count:
+        periods.append(next_period(periods[-1], period))
+    return periods[:count]
+
+
+def create_partitions(
+    connection, table: str, start: date, count: int, period: str
+) -> None:
+    for period_date in get_periods(start, count, period):
+        create_range_partition(
+            connection, table, *partition_bounds(table, period_date, period)
+        )
+
+
+def get_partition_names(connection, table: str) -> list[str]:
+    result = connection.execute(
+        text(
+            """SELECT child.relname FROM pg_inherits
+            JOIN pg_class parent ON pg_inherits.inhparent = parent.oid
+            JOIN pg_class child ON pg_inherits.inhrelid = child.oid
+            JOIN pg_namespace ON parent.relnamespace = pg_namespace.oid
+            WHERE pg_namespace.nspname = :schema AND parent.relname = :table
+            ORDER BY child.relname;"""
+        ),
+        {'schema': settings.postgres_schema, 'table': table},
+    )
+    return [name for name, in result]
+
+
+def drop_partitions_before(
+    connection, table: str, before: date, period: str, detach: bool = False
+) -> list[str]:
+    """Drop the partitions whose whole range is before the date, the default partition is kept.
+    Detached partitions are kept as standalone tables"""
+    removed = []
+    for name in get_partition_names(connection, table):
+        try:
+            start = datetime.strptime(
+                name[len(table) + 1 :], PARTITION_SUFFIXES[period]
+            ).date()
+        except ValueError:
+            continue
+        if next_period(start, period) > before:
+            continue
+        if detach:
+            connection.execute(
+                text(
+                    f"""ALTER TABLE {settings.postgres_schema}.{table}
+                    DETACH PARTITION {settings.postgres_schema}.{name};"""
+                )
+            )
+        else:
+            connection.execute(
+                text(f'DROP TABLE IF EXISTS {settings.postgres_schema}.{name};')
+            )
+        removed.append(name)
+    return removed
+
+
+def create_partition_auth_history(target, connection, **kw) -> None:
+    create_default_partition(connection, 'auth_history')
+    create_partitions(
+        connection,
+        'auth_history',
+        datetime.now(timezone.utc).date(),
+        settings.auth_history_partitions_ahead + 1,
+        'month',
+    )
+
+
+def create_partition_tokens(target, connection, **kw) -> None:
+    create_default_partition(connection, 'tokens')
+    create_partitions(
+        connection,
+        'tokens',
+        datetime.now(timezone.utc).date(),
+        settings.tokens_partitions_ahead,
+        'day',
     )
@@ -2,12 +2,16 @@ import uuid
 
 from datetime import datetime
 
+from core.hashing import password_hasher
 from core.settings import settings
 from db.sql import db_manager
-from flask_security import RoleMixin, UserMixin, utils
-from models.create_partitions import create_partition_auth_history
+from flask_security import RoleMixin, UserMixin
+from models.create_partitions import (
+    create_partition_auth_history,
+    create_partition_tokens,
+)
 from pydantic import BaseModel, EmailStr, constr
-from sqlalchemy import FetchedValue, PrimaryKeyConstraint
+from sqlalchemy import Index, PrimaryKeyConstraint, text
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.ext.hybrid import hybrid_property
 from sqlalchemy.sql import func
@@ -58,10 +62,10 @@ class User(UUIDMixin, TimeStampedMixin, UserMixin, db.Model):
 
     @password.setter
     def password(self, plaintext_password):
-        self._password = utils.hash_password(plaintext_password)
+        self._password = password_hasher.hash(plaintext_password)
 
     def verify_password(self, plaintext_password):
-        return utils.verify_password(plaintext_password, self._password)
+        return password_hasher.verify(plaintext_password, self._password)
 
 
 class LoginRequest(BaseModel):
@@ -94,25 +98,36 @@ class SocialAccount(UUIDMixin, db.Model):
         return f'<SocialAccount {self.social_provider_name}:{self.user_id}>'
 
 
-class AuthHistory(UUIDMixin, TimeStampedMixin, db.Model):
+class AuthHistory(TimeStampedMixin, db.Model):
     __tablename__ = 'auth_history'
     __table_args__ = (
-        PrimaryKeyConstraint('id', 'device'),
+        PrimaryKeyConstraint('id', 'auth_event_time'),
+        # Serves the keyset pagination of the history of a user
+        Index(
+            'ix_auth_history_user_id_time_id',
+            'user_id',
+            text('auth_event_time DESC'),
+            text('id DESC'),
+        ),
         {
             'schema': settings.postgres_schema,
-            'postgresql_partition_by': 'LIST (device)',
+            'postgresql_partition_by': 'RANGE (auth_event_time)',
             'listeners': [('after_create', create_partition_auth_history)],
         },
     )
+    # Unique constraints of a partitioned table must include the partition key
+    id = db.Column(UUID(as_uuid=True), default=uuid.uuid4, nullable=False)
     user_id = db.Column(
         UUID(as_uuid=True), db.ForeignKey('users.id', ondelete='CASCADE')
     )
     ip_address = db.Column(db.String(50), nullable=False)
     user_agent = db.Column(db.String(255), nullable=False)
     is_successful = db.Column(db.Boolean, default=False, nullable=False)
-    device = db.Column(db.String(255), primary_key=True, nullable=False)
+    device = db.Column(db.String(255), nullable=False)
     auth_event_type = db.Column(db.String(50), nullable=False)
-    auth_event_time = db.Column(db.DateTime(timezone=True), server_default=func.now())
+    auth_event_time = db.Column(
+        db.DateTime(timezone=True), nullable=False, server_default=func.now()
+    )
     auth_event_fingerprint = db.Column(db.String(255), nullable=False)
 
     def __repr__(self):
@@ -140,22 +155,29 @@ class UserRole(UUIDMixin, db.Model):
     )
 
 
-class Token(UUIDMixin, db.Model):
+class Token(db.Model):
     __tablename__ = 'tokens'
-    __table_args__ = {'schema': settings.postgres_schema}
+    __table_args__ = (
+        PrimaryKeyConstraint('id', 'expires_at'),
+        Index('ix_tokens_token_hash', 'token_hash', 'expires_at', unique=True),
+        {
+            'schema': settings.postgres_schema,
+            'postgresql_partition_by': 'RANGE (expires_at)',
+            'listeners': [('after_create', create_partition_tokens)],
+        },
+    )
+    # Unique constraints of a partitioned table must include the partition key
+    id = db.Column(UUID(as_uuid=True), default=uuid.uuid4, nullable=False)
     token_owner_id = db.Column(
         UUID(as_uuid=True),
         db.ForeignKey(f'{settings.postgres_schema}.users.id'),
         nullable=False,
     )
-    token_value = db.Column(db.Text(), nullable=False)
+    # A SHA-256 digest of the refresh token, the token itself is not stored
+    token_hash = db.Column(db.String(64), nullable=False)
     token_used = db.Column(db.Boolean, default=False)
     created_at = db.Column(db.DateTime(timezone=True), server_default=func.now())
-    expires_at = db.Column(
-        db.DateTime(timezone=True),
-        nullable=False,
-        server_default=FetchedValue(),
-    )
+    expires_at = db.Column(db.DateTime(timezone=True), nullable=False)
 
     def __repr__(self):
-        return f'<Token {self.token_owner_id, self.token_value}>'
+        return f'<Token {self.token_owner_id, self.token_hash}>'
@@ -0,0 +1,262 @@
+import atexit
+import json
+import logging
+import os
+import socket
+import time
+
+from datetime import datetime
+from uuid import UUID
+
+import gevent
+
+from core.settings import settings
+from db.redis import redis
+from db.sql import db_manager
+from gevent.queue import Empty, Full, Queue
+from models.models import AuthHistory
+from redis.exceptions import ResponseError
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.exc import DataError, IntegrityError
+
+logger = logging.getLogger(__name__)
+
+
+def insert_auth_events(engine, events: list[dict]) -> None:
+    """Insert the events with a single multi-row statement. The events inserted
+    by a previous attempt are skipped, so a failed batch can be retried"""
+    if not events:
+        return
+    with engine.begin() as connection:
+        connection.execute(
+            insert(AuthHistory.__table__).values(events).on_conflict_do_nothing()
+        )
+
+
+def write_auth_events(engine, events: list[dict]) -> None:
+    """Insert the events as a batch. If the database rejects the data of the batch, the events
+    are inserted one by one and the ones still rejected are dropped, so a malformed event
+    doesn't hold back the others. Any other error, like a lost connection, is raised,
+    so the whole batch is retried"""
+    try:
+        insert_auth_events(engine, events)
+    except (DataError, IntegrityError):
+        for event in events:
+            try:
+                insert_auth_events(engine, [event])
+            except (DataError, IntegrityError) as e:
+                logger.error(
+                    'Dropped the auth history event %s: %s', event.get('id'), e.orig
+                )
+
+
+def encode_event(event: dict) -> str:
+    return json.dumps(event, default=str)
+
+
+def decode_event(data: bytes) -> dict:
+    event = json.loads(data)
+    event['id'] = UUID(event['id'])
+    event['user_id'] = UUID(event['user_id'])
+    event['auth_event_time'] = datetime.fromisoformat(event['auth_event_time'])
+    return event
+
+
+class AuthHistoryWriter:
+    """Writes the auth events to the auth history"""
+
+    def write(self, event: dict) -> None:
+        raise NotImplementedError
+
+    def close(self) -> None:
+        pass
+
+
+class SyncAuthHistoryWriter(AuthHistoryWriter):
+    """Adds the event to the session of the request,
+    it is committed along with the rest of the authentication"""
+
+    def write(self, event: dict) -> None:
+        db_manager.db.session.add(AuthHistory(**event))
+
+
+class BufferedAuthHistoryWriter(AuthHistoryWriter):
+    """Flushes the buffered events in batches from a greenlet. The greenlet is started by the
+    first write of every process, so the workers forked by a server get their own one,
+    and the buffer is drained when the process exits"""
+
+    def __init__(self, batch_size: int, flush_interval: float):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.pid = None
+        self.engine = None
+        self.closed = False
+
+    def ensure_flusher(self) -> None:
+        if self.pid == os.getpid():
+            return
+        self.pid = os.getpid()
+        # The engine is taken in the application context of the request
+        self.engine = db_manager.db.engine
+        self.reset()
+        gevent.spawn(self.run)
+        atexit.register(self.close)
+
+    def reset(self) -> None:
+        pass
+
+    def flush_batch(self, block: bool) -> int:
+        """Flush a batch of the buffered events and return its size"""
+        raise NotImplementedError
+
+    def run(self) -> None:
+        while not self.closed:
+            try:
+                self.flush_batch(block=True)
+            except Exception:
+                logger.exception('Failed to flush the auth history events')
+                gevent.sleep(self.flush_interval)
+
+    def close(self) -> None:
+        self.closed = True
+        if self.pid != os.getpid():
+            return
+        while self.flush_batch(block=False):
+            pass
+
+
+class MemoryAuthHistoryWriter(BufferedAuthHistoryWriter):
+    """Buffers the events in a bounded in-process queue, the events not flushed yet are lost
+    if the process crashes. When the queue is full, the event is inserted at once"""
+
+    def __init__(self, batch_size: int, flush_interval: float, queue_size: int):
+        super().__init__(batch_size, flush_interval)
+        self.queue_size = queue_size
+        self.queue = Queue(maxsize=queue_size)
+        self.pending = []
+
+    def reset(self) -> None:
+        self.queue = Queue(maxsize=self.queue_size)
+        self.pending = []
+
+    def write(self, event: dict) -> None:
+        self.ensure_flusher()
+        try:
+            self.queue.put_nowait(event)
+        except Full:
+            write_auth_events(self.engine, [event])
+
+    def flush_batch(self, block: bool) -> int:
+        # The events of a failed batch are kept pending and retried first
+        if not self.pending:
+            try:
+                self.pending.append(
+                    self.queue.get(block=block, timeout=self.flush_interval)
+                )
+            except Empty:
+                return 0
+            while len(self.pending) < self.batch_size:
+                try:
+                    self.pending.append(self.queue.get_nowait())
+                except Empty:
+                    break
+        write_auth_events(self.engine, self.pending)
+        flushed, self.pending = len(self.pending), []
+        return flushed
+
+
+class RedisAuthHistoryWriter(BufferedAuthHistoryWriter):
+    """Appends the events to a Redis stream, so they survive a restart of the application.
+    The flushers of all the processes read the stream as a consumer group, an event is
+    acknowledged once it is inserted. The events left unacknowledged by a crashed consumer
+    are claimed by the others after `claim_idle_time` seconds"""
+
+    group = 'auth_history_writers'
+
+    def __init__(
+        self, batch_size: int, flush_interval: float, stream: str, claim_idle_time: int
+    ):
+        super().__init__(batch_size, flush_interval)
+        self.stream = stream
+        self.claim_idle_time = claim_idle_time
+        self.consumer = None
+        self.claimed_at = 0.0
+
+    def reset(self) -> None:
+        self.consumer = f'{socket.gethostname()}-{os.getpid()}'
+        self.claimed_at = 0.0
+        try:
+            redis.xgroup_create(self.stream, self.group, id='0', mkstream=True)
+        except ResponseError as e:
+            if 'BUSYGROUP' not in str(e):
+                raise
+
+    def write(self, event: dict) -> None:
+        self.ensure_flusher()
+        redis.xadd(self.stream, {'event': encode_event(event)})
+
+    def read_entries(self, block: bool) -> list:
+        if time.monotonic() - self.claimed_at > self.claim_idle_time:
+            redis.xautoclaim(
+                self.stream,
+                self.group,
+                self.consumer,
+                min_idle_time=self.claim_idle_time * 1000,
+                count=self.batch_size,
+            )
+            self.claimed_at = time.monotonic()
+        # The entries read but not acknowledged yet, owned or claimed, are flushed first
+        for stream_id, block_ms in (
+            ('0', None),
+            ('>', int(self.flush_interval * 1000) if block else None),
+        ):
+            response = redis.xreadgroup(
+                self.group,
+                self.consumer,
+                {self.stream: stream_id},
+                count=self.batch_size,
+                block=block_ms,
+            )
+            entries = response[0][1] if response else []
+            if entries:
+                return entries
+        return []
+
+    def flush_batch(self, block: bool) -> int:
+        entries = self.read_entries(block)
+        if not entries:
+            return 0
+        events = []
+        for entry_id, fields in entries:
+            # The entries deleted from the stream before they were acknowledged have no fields
+            if not fields:
+                continue
+            try:
+                events.append(decode_event(fields[b'event']))
+            except (KeyError, TypeError, ValueError) as e:
+                logger.error('Dropped the malformed stream entry %s: %s', entry_id, e)
+        write_auth_events(self.engine, events)
+        entry_ids = [entry_id for entry_id, _ in entries]
+        redis.xack(self.stream, self.group, *entry_ids)
+        redis.xdel(self.stream, *entry_ids)
+        return len(entries)
+
+
+def create_auth_history_writer(mode: str) -> AuthHistoryWriter:
+    if mode == 'memory':
+        return MemoryAuthHistoryWriter(
+            settings.auth_history_batch_size,
+            settings.auth_history_flush_interval,
+            settings.auth_history_queue_size,
+        )
+    if mode == 'redis':
+        return RedisAuthHistoryWriter(
+            settings.auth_history_batch_size,
+            settings.auth_history_flush_interval,
+            settings.auth_history_stream,
+            settings.auth_history_claim_idle_time,
+        )
+    return SyncAuthHistoryWriter()
+
+
+auth_history_writer = create_auth_history_writer(settings.auth_history_writer)
@@ -17,6 +17,10 @@ class BaseService:
     WRONG_PASSWORD = Rcode('WRONG_PASSWORD', 'The password is incorrect')
     EMAIL_EXISTS = Rcode('EMAIL_EXISTS', 'This email address is already used')
     ACCESS_TOKEN_EXPIRED = Rcode('ACCESS_TOKEN_EXPIRED', 'Access token has expired')
+    INVALID_CURSOR = Rcode('INVALID_CURSOR', 'This pagination cursor is invalid')
+    INVALID_PAGINATION = Rcode(
+        'INVALID_PAGINATION', 'The page and per_page must be integers'
+    )
 
     def __init__(self):
         pass
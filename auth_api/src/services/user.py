@@ -1,6 +1,12 @@
-from datetime import datetime
-from typing import Union
+import base64
+import hashlib
+import json
 
+from datetime import datetime, timedelta, timezone
+from typing import Optional, Union
+from uuid import UUID, uuid4
+
+from core.hashing import password_hasher
 from core.security_setup import user_datastore
 from core.settings import settings
 from core.tracer_setup import get_trace
@@ -14,13 +20,15 @@ from models.models import (
     AuthHistory,
     LoginRequest,
     ModifyRequest,
-    Role,
     SignupRequest,
     Token,
     User,
     UserRole,
 )
+from services.auth_history import auth_history_writer
 from services.base import BaseService
+from sqlalchemy import func, tuple_
+from sqlalchemy.orm import joinedload
 
 
 @get_trace('generate_tokens')
@@ -37,6 +45,22 @@ def generate_tokens(user: User):
     return access_token, refresh_token
 
 
+def hash_token(token: str) -> str:
+    """Return the digest a refresh token is stored and looked up by"""
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+def encode_cursor(event: AuthHistory) -> str:
+    """Return an opaque cursor pointing after the auth history event"""
+    position = [event.auth_event_time.isoformat(), str(event.id)]
+    return base64.urlsafe_b64encode(json.dumps(position).encode()).decode()
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, UUID]:
+    event_time, event_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    return datetime.fromisoformat(event_time), UUID(event_id)
+
+
 @get_trace('authenticate')
 def authenticate(access_token) -> None:
     """Check that access token is fresh"""
@@ -46,6 +70,41 @@ def authenticate(access_token) -> None:
         )
 
 
+def password_upgrades_key() -> str:
+    return 'password_hash_upgrades'
+
+
+def user_roles_key(user_id) -> str:
+    # The ids taken from the requests aren't necessarily in the canonical form
+    return f'user_roles:{UUID(str(user_id))}'
+
+
+def user_roles_generation_key(user_id) -> str:
+    return f'user_roles_generation:{UUID(str(user_id))}'
+
+
+def get_role_user_ids(role_id) -> list:
+    """Return the ids of the users having the role"""
+    return [
+        user_id
+        for user_id, in db_manager.db.session.query(UserRole.user_id).filter(
+            UserRole.role_id == role_id
+        )
+    ]
+
+
+def invalidate_user_roles(*user_ids) -> None:
+    """Drop the cached roles of the users, call it once the role changes are committed.
+    Their generation is bumped, so the roles loaded before are never served from the cache,
+    even if a concurrent request caches them afterwards"""
+    if user_ids:
+        pipeline = redis.pipeline()
+        for user_id in user_ids:
+            pipeline.incr(user_roles_generation_key(user_id))
+        pipeline.delete(*(user_roles_key(user_id) for user_id in user_ids))
+        pipeline.execute()
+
+
 class UserService(BaseService):
     def create_user(self, username: str, password: str, email: str):
         existing_user: User = User.query.filter(
@@ -92,6 +151,13 @@ class UserService(BaseService):
                 error_code=self.WRONG_PASSWORD.code, message=self.WRONG_PASSWORD.message
             )
 
+        # The plaintext password is only known here, so a stale hash is upgraded on login,
+        # it is committed along with the authentication
+        stale_scheme = None
+        if password_hasher.needs_update(user.password):
+            stale_scheme = password_hasher.identify(user.password)
+            user.password = password
+
         access_token, refresh_token = generate_tokens(user)
         self.commit_authentication(
             user=user,
@@ -100,6 +166,8 @@ class UserService(BaseService):
             refresh_token=refresh_token,
             user_info=user_info,
         )
+        if stale_scheme:
+            redis.hincrby(password_upgrades_key(), stale_scheme, 1)
 
         return access_token, refresh_token
 
@@ -110,8 +178,10 @@ class UserService(BaseService):
             )
 
     def check_token(self, refresh_token: str) -> str:
+        # Expired partitions are pruned by the expires_at condition
         current_refresh_token = Token.query.filter(
-            Token.token_value == refresh_token
+            Token.token_hash == hash_token(refresh_token),
+            Token.expires_at > func.now(),
         ).first()
         if not current_refresh_token:
             raise ServiceException(
@@ -157,9 +227,11 @@ class UserService(BaseService):
         return access_token, refresh_token
 
     def get_auth_history(self, user_id, page: int = 1, per_page: int = 3):
-        history_pagination: QueryPagination = AuthHistory.query.filter(
-            (AuthHistory.user_id == user_id)
-        ).paginate(page=page, per_page=per_page)
+        history_pagination: QueryPagination = (
+            AuthHistory.query.filter(AuthHistory.user_id == user_id)
+            .order_by(AuthHistory.auth_event_time.desc())
+            .paginate(page=page, per_page=per_page)
+        )
 
         result = {
             "total": history_pagination.total,
@@ -178,6 +250,57 @@ class UserService(BaseService):
         }
         return result
 
+    def get_auth_history_by_cursor(
+        self,
+        user_id,
+        cursor: Optional[str] = None,
+        per_page: int = 3,
+        with_total: bool = False,
+    ):
+        """Return a page of the auth history, newest events first, starting after the cursor.
+        The page is read with an index range scan, so its cost doesn't depend on its position,
+        counting the total is optional as it reads the whole history of the user"""
+        query = AuthHistory.query.filter(AuthHistory.user_id == user_id)
+        page_query = query
+        if cursor:
+            try:
+                position = decode_cursor(cursor)
+            except (ValueError, TypeError):
+                raise ServiceException(
+                    error_code=self.INVALID_CURSOR.code,
+                    message=self.INVALID_CURSOR.message,
+                )
+            page_query = page_query.filter(
+                tuple_(AuthHistory.auth_event_time, AuthHistory.id) < tuple_(*position)
+            )
+        # One more event is read to know whether there is a next page
+        events = (
+            page_query.order_by(
+                AuthHistory.auth_event_time.desc(), AuthHistory.id.desc()
+            )
+            .limit(per_page + 1)
+            .all()
+        )
+        next_cursor = None
+        if len(events) > per_page:
+            next_cursor = encode_cursor(events[per_page - 1])
+
+        result = {
+            "per_page": per_page,
+            "next_cursor": next_cursor,
+            "events": [
+                {
+                    'uuid': event.id,
+                    'time': event.auth_event_time,
+                    'fingerprint': event.auth_event_fingerprint,
+                }
+                for event in events[:per_page]
+            ],
+        }
+        if with_total:
+            result["total"] = query.count()
+        return result
+
     def modify(self, user_id, new_username: str, new_password: str):
         user: User = User.query.get(user_id)
 
@@ -202,17 +325,36 @@ class UserService(BaseService):
         if db_manager.db.session.is_modified(user):
             db_manager.db.session.commit()
 
-    def get_user_roles_list(self, user_id: str) -> list[Role]:
-        existing_user: User = User.query.get(user_id)
+    def get_user_roles_list(self, user_id: str) -> list[dict]:
+        """Return the roles of the user. They are cached in Redis until they are changed,
+        on a cache miss the user and its roles are loaded with a single joined query"""
+        key = user_roles_key(user_id)
+        cached_roles, generation = redis.mget(key, user_roles_generation_key(user_id))
+        generation = int(generation or 0)
+        if cached_roles is not None:
+            cached_roles = json.loads(cached_roles)
+            # The entries cached before the generations were introduced are plain lists
+            if (
+                isinstance(cached_roles, dict)
+                and cached_roles['generation'] == generation
+            ):
+                return cached_roles['roles']
+
+        existing_user: User = User.query.options(joinedload(User.roles)).get(user_id)
         if not existing_user:
             error_code = self.USER_NOT_FOUND.code
             message = self.USER_NOT_FOUND.message
             raise ServiceException(error_code=error_code, message=message)
 
-        user_roles = UserRole.query.filter(UserRole.user_id == user_id).all()
-
-        role_ids = [r.role_id for r in user_roles]
-        roles = [Role.query.get(role_id) for role_id in role_ids]
+        roles = [
+            {'role_id': str(role.id), 'role_name': role.name}
+            for role in existing_user.roles
+        ]
+        redis.set(
+            name=key,
+            value=json.dumps({'generation': generation, 'roles': roles}),
+            ex=settings.user_roles_cache_expires,
+        )
         return roles
 
     @staticmethod
@@ -224,22 +366,31 @@ class UserService(BaseService):
         user_info: dict = None,
     ):
         """Finalize successful authentication saving the details."""
-        # TODO: Delete expires_at placeholder
         token = Token(
-            token_owner_id=user.id, token_value=refresh_token, expires_at=datetime.now()
+            token_owner_id=user.id,
+            token_hash=hash_token(refresh_token),
+            expires_at=datetime.now(timezone.utc)
+            + timedelta(seconds=settings.jwt_refresh),
         )
         db_manager.db.session.add(token)
 
         if event_type == 'login':
-            auth_event = AuthHistory(
-                user_id=user.id,
-                ip_address='127.0.0.1',  # TODO: получить айпи пользователя
-                user_agent='Mozilla/5.0 (<system-information>) <platform> (<platform-details>) <extensions>',
-                device='desktop',
-                auth_event_type=event_type,
-                auth_event_fingerprint=str(user_info),
+            # Unless the writer is synchronous, the event is inserted after the request
+            auth_history_writer.write(
+                {
+                    'id': uuid4(),
+                    'user_id': user.id,
+                    'ip_address': '127.0.0.1',  # TODO: получить айпи пользователя
+                    'user_agent': 'Mozilla/5.0 (<system-information>) <platform> (<platform-details>) <extensions>',
+                    'device': 'desktop',
+                    'auth_event_type': event_type,
+                    'auth_event_time': datetime.now(timezone.utc),
+                    # The user agent comes from the client, it may be of any length
+                    'auth_event_fingerprint': str(user_info)[
+                        : AuthHistory.auth_event_fingerprint.type.length
+                    ],
+                }
             )
-            db_manager.db.session.add(auth_event)
 
         db_manager.db.session.commit()
         redis.set(name=access_token, value='', ex=settings.jwt_access)